@@ -0,0 +1,151 @@
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.mock_stack import Faults, MockStack
+
+
+class StageTimer(logging.Handler):
+    """Times each stage logged by `flight_deals.__main__`, from its
+    `Doing something...` line to the line that follows it."""
+
+    def __init__(self) -> None:
+        super().__init__(level=logging.INFO)
+        self.stages: dict[str, float] = {}
+        self._started: tuple[str, float] | None = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if self._started is not None:
+            stage, started_at = self._started
+            self.stages[stage] = round(record.created - started_at, 3)
+            self._started = None
+        if message.endswith('...'):
+            self._started = (message.rstrip('.'), record.created)
+
+
+def get_peak_rss_mb() -> float:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    scale = 2**20 if sys.platform == 'darwin' else 2**10
+    return round(peak_rss / scale, 2)
+
+
+def run_child() -> None:
+    timer = StageTimer()
+    logging.basicConfig(level=logging.INFO, handlers=[timer])
+
+    from flight_deals.__main__ import main
+
+    main([])
+    print(
+        json.dumps({'stages': timer.stages, 'peak_rss_mb': get_peak_rss_mb()})
+    )
+
+
+def make_environment(stack: MockStack, cache_dir: Path) -> dict[str, str]:
+    return {
+        'FLIGHT_API_RATE_LIMIT': '1000',
+        'FLIGHT_API_BURST': '100',
+        **os.environ,
+        'SHEET_API_SPREADSHEET_URL': f'{stack.http_url}/sheet/',
+        'FLIGHT_API_BASE_URL': f'{stack.http_url}/flight/',
+        'FLIGHT_API_KEY': 'benchmark',
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_PORT': str(stack.smtp_port),
+        'SMTP_USERNAME': 'benchmark',
+        'SMTP_PASSWORD': 'benchmark',
+        'EMAIL_SENDER': 'benchmark@example.com',
+        'EMAIL_RECIPIENTS': 'benchmark@example.com',
+        'CACHE_DIR': str(cache_dir),
+    }
+
+
+def run_once(
+    stack: MockStack, destinations: int, workdir: Path
+) -> dict[str, Any]:
+    stack.state.reset(destinations)
+    stack.sent_emails[0] = 0
+
+    started_at = time.perf_counter()
+    child = subprocess.run(
+        [sys.executable, '-m', 'benchmarks', '--child'],
+        env=make_environment(stack, workdir / f'cache-{destinations}'),
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - started_at
+    if child.returncode:
+        raise RuntimeError(f'Run failed:\n{child.stderr}')
+
+    return {
+        'destinations': destinations,
+        'wall_time': round(wall_time, 3),
+        'requests': stack.state.requests,
+        'requests_per_second': round(stack.state.requests / wall_time, 1),
+        'emails': stack.sent_emails[0],
+        **json.loads(child.stdout.splitlines()[-1]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description=(
+            'Run `python -m flight_deals` end to end against local mock '
+            'APIs and an SMTP sink. Other settings (e.g. SEARCH_MAX_WORKERS) '
+            'are read from the environment as usual.'
+        ),
+    )
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 100, 1_000, 10_000]
+    )
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        with MockStack(workdir) as stack:
+            stack.state.faults = Faults(
+                latency=args.latency,
+                error_rate=args.error_rate,
+                throttle_rate=args.throttle_rate,
+                retry_after=args.retry_after,
+            )
+
+            results = []
+            for size in args.sizes:
+                result = run_once(stack, size, workdir)
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+
+    report = json.dumps(results, indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        args.output.write_text(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+import json
+import posixpath
+import random
+import socketserver
+import ssl
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 0.0
+
+
+@dataclass
+class MockState:
+    faults: Faults = field(default_factory=Faults)
+    sheets: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    requests: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def reset(self, destinations: int, recipients: int = 3) -> None:
+        with self.lock:
+            self.requests = 0
+            self.sheets = {
+                'destinations': [
+                    {
+                        'id': row_id,
+                        'city': f'City {row_id}',
+                        'iataCode': '',
+                        'lowestPrice': 1_000,
+                    }
+                    for row_id in range(2, destinations + 2)
+                ],
+                'recipients': [
+                    {'id': row_id, 'email': f'user{row_id}@example.com'}
+                    for row_id in range(2, recipients + 2)
+                ],
+            }
+
+
+def make_itinerary(fly_from: str, fly_to: str, price: int) -> dict[str, Any]:
+    departure = date.today() + timedelta(days=random.randint(1, 170))
+    arrival = departure + timedelta(days=7)
+
+    def make_flight(
+        origin: str, destination: str, day: date
+    ) -> dict[str, Any]:
+        return {
+            'flyFrom': origin,
+            'flyTo': destination,
+            'cityFrom': origin,
+            'cityCodeFrom': origin,
+            'cityTo': destination,
+            'cityCodeTo': destination,
+            'return': int(origin != fly_from),
+            'local_departure': f'{day}T10:00:00.000Z',
+            'local_arrival': f'{day}T18:00:00.000Z',
+        }
+
+    return {
+        'cityFrom': fly_from,
+        'cityCodeFrom': fly_from,
+        'cityTo': fly_to,
+        'cityCodeTo': fly_to,
+        'price': price,
+        'conversion': {'BRL': price},
+        'nightsInDest': 7,
+        'route': [
+            make_flight(fly_from, fly_to, departure),
+            make_flight(fly_to, fly_from, arrival),
+        ],
+    }
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """Serves the sheet API under /sheet/ and the flight API under
+    /flight/. Latency applies to every request; errors and 429s only to
+    the flight API, which is the one that retries."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    state: MockState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(
+        self, data: Any, status: HTTPStatus = HTTPStatus.OK
+    ) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self) -> bool:
+        faults = self.state.faults
+        with self.state.lock:
+            self.state.requests += 1
+
+        if faults.latency:
+            time.sleep(faults.latency)
+
+        if not self.path.startswith('/flight/'):
+            return False
+
+        if random.random() < faults.throttle_rate:
+            self.send_response(HTTPStatus.TOO_MANY_REQUESTS)
+            self.send_header('Retry-After', str(faults.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+
+        if random.random() < faults.error_rate:
+            self._send_json({}, HTTPStatus.INTERNAL_SERVER_ERROR)
+            return True
+
+        return False
+
+    def do_GET(self) -> None:
+        if self._inject_faults():
+            return
+
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path.startswith('/sheet/'):
+            sheet_name = posixpath.basename(url.path)
+            with self.state.lock:
+                rows = list(self.state.sheets.get(sheet_name, []))
+            self._send_json({sheet_name: rows})
+        elif url.path == '/flight/locations/query':
+            city = query.get('term', '')
+            code = 'X' + ''.join(filter(str.isdigit, city))
+            self._send_json({'locations': [{'name': city, 'code': code}]})
+        elif url.path == '/flight/v2/search':
+            price_to = int(query.get('price_to', 2_000))
+            limit = int(query.get('limit', 10))
+            self._send_json(
+                {
+                    'data': [
+                        make_itinerary(
+                            query['fly_from'],
+                            query['fly_to'],
+                            random.randint(price_to // 2, price_to * 2),
+                        )
+                        for _ in range(random.randint(0, limit))
+                    ]
+                }
+            )
+        else:
+            self._send_json({}, HTTPStatus.NOT_FOUND)
+
+    def do_PUT(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self._inject_faults():
+            return
+
+        sheet_name, row_id = urlsplit(self.path).path.split('/')[-2:]
+        (row,) = body.values()
+        with self.state.lock:
+            rows = self.state.sheets.setdefault(sheet_name, [])
+            for index, current in enumerate(rows):
+                if str(current['id']) == row_id:
+                    rows[index] = row
+        self._send_json(body)
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Accepts and discards mail, supporting just enough ESMTP (EHLO,
+    STARTTLS, AUTH, MAIL, RCPT, DATA, QUIT) for smtplib."""
+
+    disable_nagle_algorithm = True
+    tls_context: ssl.SSLContext
+    counter: list[int]
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f'{line}\r\n'.encode())
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        self._reply('220 localhost ESMTP sink')
+        in_data = False
+        while line := self.rfile.readline():
+            command = line.strip().upper()
+            if in_data:
+                if command == b'.':
+                    in_data = False
+                    self.counter[0] += 1
+                    self._reply('250 OK')
+            elif command.startswith((b'EHLO', b'HELO')):
+                self._reply('250-localhost')
+                self._reply('250-AUTH PLAIN LOGIN')
+                self._reply('250 STARTTLS')
+            elif command.startswith(b'STARTTLS'):
+                self._reply('220 Ready to start TLS')
+                self.request = self.tls_context.wrap_socket(
+                    self.request, server_side=True
+                )
+                self.rfile = self.request.makefile('rb')
+                self.wfile = self.request.makefile('wb')
+            elif command.startswith(b'AUTH'):
+                self._reply('235 Authentication successful')
+            elif command.startswith(b'DATA'):
+                in_data = True
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command.startswith(b'QUIT'):
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+
+def make_tls_context(directory: Path) -> ssl.SSLContext:
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    subprocess.run(
+        [
+            'openssl',
+            'req',
+            '-x509',
+            '-newkey',
+            'rsa:2048',
+            '-nodes',
+            '-days',
+            '1',
+            '-subj',
+            '/CN=localhost',
+            '-keyout',
+            str(key),
+            '-out',
+            str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+class MockStack:
+    """Runs the mock HTTP APIs and the SMTP sink on local ports."""
+
+    def __init__(self, workdir: Path, state: MockState | None = None):
+        self.state = state or MockState()
+        self.sent_emails = [0]
+
+        http_handler = type(
+            'Handler', (MockAPIHandler,), {'state': self.state}
+        )
+        self.http_server = ThreadingHTTPServer(('127.0.0.1', 0), http_handler)
+        self.http_server.daemon_threads = True
+
+        smtp_handler = type(
+            'Handler',
+            (SMTPSinkHandler,),
+            {
+                'tls_context': make_tls_context(workdir),
+                'counter': self.sent_emails,
+            },
+        )
+        self.smtp_server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), smtp_handler
+        )
+        self.smtp_server.daemon_threads = True
+
+    @property
+    def http_url(self) -> str:
+        host, port = self.http_server.server_address[:2]
+        return f'http://{host!s}:{port}'
+
+    @property
+    def smtp_port(self) -> int:
+        return self.smtp_server.server_address[1]
+
+    def __enter__(self) -> 'MockStack':
+        for server in (self.http_server, self.smtp_server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for server in (self.http_server, self.smtp_server):
+            server.shutdown()
+            server.server_close()
@@ -1,17 +1,40 @@
+import argparse
 import logging
+from contextlib import ExitStack, closing
 from datetime import date, timedelta
+from pathlib import Path
 from smtplib import SMTP
+from typing import Any, Callable, Iterable
 
+from flight_deals import settings
 from flight_deals.controller import (
-    find_cheap_flights,
+    find_cheap_flights_by_origin,
+    iter_cheap_flights,
     notify,
+    notify_digest,
+    notify_each_recipient,
+    rank_cheap_flights_by_origin,
     update_destination_codes,
 )
+from flight_deals.daemon import Daemon
 from flight_deals.data_manager import DataManager
 from flight_deals.email_client import EmailClient
+from flight_deals.email_pool import EmailPool
+from flight_deals.flight_data import FlightItinerary
 from flight_deals.flight_search import FlightSearch
-from flight_deals.settings import EMAIL, FLIGHT_API, SHEET_API, SMTP_SERVER
-from flight_deals.sheet_api import SheetAPI
+from flight_deals.http_session import make_session
+from flight_deals.iata_cache import IATACodeCache
+from flight_deals.itinerary_store import ItineraryStore
+from flight_deals.json_file import write_json, write_text
+from flight_deals.metrics import metrics
+from flight_deals.price_history import DropDetector, PriceHistory
+from flight_deals.rate_limit import TokenBucket
+from flight_deals.scoring import ScoringRules
+from flight_deals.search_cache import MemoryCache, SearchCache, SQLiteCache
+from flight_deals.search_plan import SearchPlan
+from flight_deals.sent_index import SentIndex
+from flight_deals.sharding import sharded
+from flight_deals.sheet_api import SheetAPI, SheetUpdateError
 
 
 def load_data_manager(data_manager: DataManager) -> DataManager:
@@ -21,67 +44,444 @@ def load_data_manager(data_manager: DataManager) -> DataManager:
     return data_manager
 
 
-def main() -> None:
+def make_search_cache(stack: ExitStack) -> SearchCache | None:
+    if settings.CACHE.SEARCH_BACKEND == 'memory':
+        return MemoryCache(
+            ttl=settings.CACHE.SEARCH_TTL,
+            max_entries=settings.CACHE.SEARCH_MAX_ENTRIES,
+        )
+
+    if settings.CACHE.SEARCH_BACKEND == 'disk':
+        return stack.enter_context(
+            closing(
+                SQLiteCache(
+                    path=settings.CACHE.DIR / 'search_responses.sqlite3',
+                    ttl=settings.CACHE.SEARCH_TTL,
+                    max_entries=settings.CACHE.SEARCH_MAX_ENTRIES,
+                )
+            )
+        )
+
+    return None
+
+
+def make_drop_detector(stack: ExitStack) -> DropDetector | None:
+    if not settings.HISTORY.ENABLED:
+        return None
+
+    return DropDetector(
+        history=stack.enter_context(PriceHistory(settings.HISTORY.PATH)),
+        window_days=settings.HISTORY.WINDOW_DAYS,
+        min_samples=settings.HISTORY.MIN_SAMPLES,
+        z_score=settings.HISTORY.Z_SCORE,
+    )
+
+
+def export_metrics() -> None:
+    if settings.METRICS.JSON_PATH is not None:
+        write_json(settings.METRICS.JSON_PATH, metrics.to_dict())
+        logging.info(
+            f'Metrics report written to {settings.METRICS.JSON_PATH}.'
+        )
+    if settings.METRICS.PROMETHEUS_PATH is not None:
+        write_text(settings.METRICS.PROMETHEUS_PATH, metrics.to_prometheus())
+        logging.info(
+            f'Metrics exported to {settings.METRICS.PROMETHEUS_PATH}.'
+        )
+
+
+def export_itineraries(store: ItineraryStore | None) -> None:
+    if store is None or settings.SEARCH.EXPORT_PATH is None:
+        return
+
+    write_text(settings.SEARCH.EXPORT_PATH, store.to_csv())
+    logging.info(
+        f'{len(store)} itineraries exported to {settings.SEARCH.EXPORT_PATH}.'
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m flight_deals',
+        description='Notify recipients by email about cheap flights.',
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help=(
+            'keep running, searching every DAEMON_INTERVAL seconds until '
+            'SIGTERM or SIGINT'
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s | %(name)s | %(levelname)s: %(message)s',
     )
 
-    sheet_api = SheetAPI(
-        spreadsheet_url=SHEET_API.SPREADSHEET_URL,
-        auth=SHEET_API.AUTH,
-    )
-    flight_search = FlightSearch(
-        base_url=FLIGHT_API.BASE_URL,
-        api_key=FLIGHT_API.KEY,
-    )
-    email_client = EmailClient(
-        smtp_server=SMTP(host=f'{SMTP_SERVER.HOST}:{SMTP_SERVER.PORT}'),
+    with ExitStack() as stack:
+        if settings.METRICS.ENABLED:
+            metrics.enable()
+            if not args.daemon:
+                stack.callback(export_metrics)
+
+        session = stack.enter_context(
+            make_session(
+                pool_connections=settings.HTTP.POOL_CONNECTIONS,
+                pool_maxsize=settings.HTTP.POOL_MAXSIZE,
+            )
+        )
+        iata_cache = stack.enter_context(
+            IATACodeCache(
+                path=settings.CACHE.DIR / 'iata_codes.json',
+                ttl=settings.CACHE.IATA_TTL,
+                negative_ttl=settings.CACHE.IATA_NEGATIVE_TTL,
+            )
+        )
+        search_cache = make_search_cache(stack)
+        detector = make_drop_detector(stack)
+        sent_index = (
+            stack.enter_context(
+                SentIndex(
+                    path=settings.CACHE.DIR / 'sent_notifications.sqlite3',
+                    ttl=settings.EMAIL.DEDUP_TTL,
+                    price_bucket=settings.EMAIL.DEDUP_PRICE_BUCKET,
+                )
+            )
+            if settings.EMAIL.DEDUP
+            else None
+        )
+
+        sheet_api = SheetAPI(
+            spreadsheet_url=settings.SHEET_API.SPREADSHEET_URL,
+            auth=settings.SHEET_API.AUTH,
+            session=session,
+            max_workers=settings.SHEET_API.MAX_WORKERS,
+        )
+        flight_search = FlightSearch(
+            base_url=settings.FLIGHT_API.BASE_URL,
+            api_key=settings.FLIGHT_API.KEY,
+            session=session,
+            rate_limiter=TokenBucket(
+                rate=settings.FLIGHT_API.RATE_LIMIT,
+                burst=settings.FLIGHT_API.BURST,
+            ),
+            max_retries=settings.FLIGHT_API.MAX_RETRIES,
+            cache=search_cache,
+            max_retry_after=settings.FLIGHT_API.MAX_RETRY_AFTER,
+        )
+        email_client: EmailClient | EmailPool = (
+            EmailPool(
+                make_email_client,
+                size=settings.SMTP_SERVER.POOL_SIZE,
+                max_retries=settings.SMTP_SERVER.MAX_RETRIES,
+            )
+            if settings.EMAIL.PER_RECIPIENT
+            else make_email_client()
+        )
+
+        if not args.daemon:
+            run(
+                sheet_api,
+                flight_search,
+                email_client,
+                iata_cache,
+                detector,
+                sent_index,
+            )
+            return
+
+        run_daemon(
+            sheet_api,
+            flight_search,
+            email_client,
+            iata_cache,
+            detector,
+            sent_index,
+        )
+
+
+def make_email_client() -> EmailClient:
+    smtp_server = settings.SMTP_SERVER
+
+    # Not given a host, SMTP does not connect until the client needs it.
+    return EmailClient(
+        smtp_server=SMTP(),
         credentials=(
-            SMTP_SERVER.USERNAME.get_secret_value(),
-            SMTP_SERVER.PASSWORD.get_secret_value(),
+            smtp_server.USERNAME.get_secret_value(),
+            smtp_server.PASSWORD.get_secret_value(),
         ),
+        max_messages_per_connection=smtp_server.MAX_MESSAGES_PER_CONNECTION,
+        address=(smtp_server.HOST, smtp_server.PORT),
+    )
+
+
+def get_mirror_path(sheet_name: str) -> Path | None:
+    if not settings.SHEET_API.INCREMENTAL_SYNC:
+        return None
+    return settings.CACHE.DIR / f'{sheet_name}.json'
+
+
+def make_data_manager(sheet_name: str, sheet_api: SheetAPI) -> DataManager:
+    return DataManager(
+        sheet_name, sheet_api, mirror_path=get_mirror_path(sheet_name)
+    )
+
+
+def load_recipients_emails(recipients: DataManager) -> list[str]:
+    load_data_manager(recipients)
+    return [recipient['email'] for recipient in recipients.data]
+
+
+def make_search_fn(
+    flight_search: FlightSearch,
+) -> Callable[..., list[dict[str, Any]]]:
+    if settings.SEARCH.SHARD_DAYS is None:
+        return flight_search.search_flights
+
+    return sharded(
+        flight_search.search_flights,
+        days=settings.SEARCH.SHARD_DAYS,
+        max_workers=settings.SEARCH.SHARD_WORKERS,
     )
 
-    recipients = load_data_manager(DataManager('destinations', sheet_api))
+
+def prepare_destinations(
+    destinations: DataManager,
+    flight_search: FlightSearch,
+    iata_cache: IATACodeCache,
+) -> None:
+    load_data_manager(destinations)
 
     logging.info('Updating destination codes...')
-    update_destination_codes(
-        recipients, flight_search.get_iata_code_by_city_name
+    try:
+        update_destination_codes(
+            destinations,
+            iata_cache.cached(flight_search.get_iata_code_by_city_name),
+            max_workers=settings.SEARCH.MAX_WORKERS,
+        )
+    except SheetUpdateError as error:
+        # The codes are still used for this run; the rows stay dirty and
+        # are written back on the next update.
+        for row_id, row_error in error.failed.items():
+            logging.warning(f'Failed to update row {row_id}: {row_error!r}')
+    logging.info(
+        'Destination codes update completed '
+        f'(cache hits: {iata_cache.hits}, misses: {iata_cache.misses}, '
+        f'coalesced: {iata_cache.coalesced}).'
+    )
+
+
+def send_notifications(
+    flights: Iterable[FlightItinerary],
+    email_client: EmailClient | EmailPool,
+    recipients_emails: list[str],
+    sent_index: SentIndex | None = None,
+) -> None:
+    if isinstance(email_client, EmailPool):
+        report = notify_each_recipient(
+            flights,
+            email_client,
+            settings.EMAIL.SENDER,
+            recipients_emails,
+            sent_index,
+            digest=settings.EMAIL.DIGEST,
+        )
+        logging.info(f'Email pool report: {report}.')
+        return
+
+    notify_fn = notify_digest if settings.EMAIL.DIGEST else notify
+    notify_fn(
+        flights,
+        email_client,
+        settings.EMAIL.SENDER,
+        recipients_emails,
+        sent_index,
     )
-    logging.info('Destination codes update completed.')
 
+
+def make_search_params() -> dict[str, Any]:
     tomorrow = f'{date.today() + timedelta(days=1):%d/%m/%Y}'
     six_months_from_now = f'{date.today() + timedelta(days=180):%d/%m/%Y}'
+    return {
+        'date_from': tomorrow,
+        'date_to': six_months_from_now,
+        'curr': 'BRL',
+        'max_stopovers': 2,
+    }
 
-    logging.info('Searching for cheap flights...')
-    cheap_flights = find_cheap_flights(
-        recipients,
-        flight_search.search_flights,
-        {
-            'fly_from': 'SSA',
-            'date_from': tomorrow,
-            'date_to': six_months_from_now,
-            'curr': 'BRL',
-            'max_stopovers': 2,
-        },
+
+def search_and_notify(
+    destinations: DataManager,
+    recipients: DataManager,
+    search_flights_fn: Callable[..., list[dict[str, Any]]],
+    email_client: EmailClient | EmailPool,
+    detector: DropDetector | None = None,
+    sent_index: SentIndex | None = None,
+) -> None:
+    search_params = make_search_params()
+    store = (
+        ItineraryStore() if settings.SEARCH.EXPORT_PATH is not None else None
+    )
+
+    if settings.SEARCH.STREAMING:
+        recipients_emails = load_recipients_emails(recipients)
+        if not recipients_emails:
+            logging.info('No email found.')
+            return
+
+        logging.info(
+            'Searching for cheap flights from '
+            f'{", ".join(settings.SEARCH.ORIGINS)} '
+            'and sending notifications...'
+        )
+        send_notifications(
+            iter_cheap_flights(
+                destinations,
+                search_flights_fn,
+                search_params,
+                origins=settings.SEARCH.ORIGINS,
+                max_workers=settings.SEARCH.MAX_WORKERS,
+                store=store,
+                detector=detector,
+            ),
+            email_client,
+            recipients_emails,
+            sent_index,
+        )
+        logging.info('Sending emails completed.')
+        export_itineraries(store)
+        return
+
+    logging.info(
+        'Searching for cheap flights from '
+        f'{", ".join(settings.SEARCH.ORIGINS)}...'
     )
+    if settings.SCORING.ENABLED:
+        cheap_flights_by_origin = rank_cheap_flights_by_origin(
+            destinations,
+            search_flights_fn,
+            search_params,
+            origins=settings.SEARCH.ORIGINS,
+            max_workers=settings.SEARCH.MAX_WORKERS,
+            rules=ScoringRules(
+                within_price_cap=settings.SCORING.WITHIN_PRICE_CAP,
+                max_price_per_night=settings.SCORING.MAX_PRICE_PER_NIGHT,
+                max_stopovers=settings.SCORING.MAX_STOPOVERS,
+                median_ratio=settings.SCORING.MEDIAN_RATIO,
+                top_k=settings.SCORING.TOP_K,
+            ),
+            store=store,
+            detector=detector,
+        )
+    else:
+        cheap_flights_by_origin = find_cheap_flights_by_origin(
+            destinations,
+            search_flights_fn,
+            search_params,
+            origins=settings.SEARCH.ORIGINS,
+            max_workers=settings.SEARCH.MAX_WORKERS,
+            store=store,
+            detector=detector,
+        )
     logging.info('Search completed.')
+    export_itineraries(store)
 
-    if not cheap_flights:
+    if not any(cheap_flights_by_origin.values()):
         logging.info('No cheap flights found.')
         return
 
-    recipients = load_data_manager(DataManager('recipients', sheet_api))
-    recipients_emails = [recipient['email'] for recipient in recipients.data]
+    recipients_emails = load_recipients_emails(recipients)
     if not recipients_emails:
         logging.info('No email found.')
         return
 
     logging.info('Sending flight notification by email...')
-    notify(cheap_flights, email_client, EMAIL.SENDER, recipients_emails)
+    for cheap_flights in cheap_flights_by_origin.values():
+        if cheap_flights:
+            send_notifications(
+                cheap_flights,
+                email_client,
+                recipients_emails,
+                sent_index,
+            )
     logging.info('Sending emails completed.')
 
 
+def run(
+    sheet_api: SheetAPI,
+    flight_search: FlightSearch,
+    email_client: EmailClient | EmailPool,
+    iata_cache: IATACodeCache,
+    detector: DropDetector | None = None,
+    sent_index: SentIndex | None = None,
+) -> None:
+    destinations = make_data_manager('destinations', sheet_api)
+    prepare_destinations(destinations, flight_search, iata_cache)
+    search_and_notify(
+        destinations,
+        make_data_manager('recipients', sheet_api),
+        make_search_fn(flight_search),
+        email_client,
+        detector,
+        sent_index,
+    )
+
+
+def run_daemon(
+    sheet_api: SheetAPI,
+    flight_search: FlightSearch,
+    email_client: EmailClient | EmailPool,
+    iata_cache: IATACodeCache,
+    detector: DropDetector | None = None,
+    sent_index: SentIndex | None = None,
+) -> None:
+    """Run a search cycle every `settings.DAEMON.INTERVAL` seconds, reusing the
+    session, caches and sheets loaded by previous cycles.
+
+    Metrics are exported at the end of every cycle, then reset.
+    """
+
+    daemon = Daemon(interval=settings.DAEMON.INTERVAL)
+    daemon.install_signal_handlers()
+    destinations = make_data_manager('destinations', sheet_api)
+    recipients = make_data_manager('recipients', sheet_api)
+
+    def run_cycle() -> None:
+        try:
+            prepare_destinations(destinations, flight_search, iata_cache)
+            search_and_notify(
+                destinations,
+                recipients,
+                daemon.stagger(
+                    make_search_fn(flight_search),
+                    searches=len(
+                        SearchPlan(
+                            settings.SEARCH.ORIGINS,
+                            destinations.data,
+                            make_search_params(),
+                        )
+                    ),
+                    spread=settings.DAEMON.INTERVAL * settings.DAEMON.SPREAD,
+                ),
+                email_client,
+                detector,
+                sent_index,
+            )
+            iata_cache.save()
+        finally:
+            # Each export covers a single cycle.
+            if settings.METRICS.ENABLED:
+                export_metrics()
+                metrics.reset()
+
+    logging.info(f'Running every {settings.DAEMON.INTERVAL:g} seconds.')
+    daemon.run_forever(run_cycle)
+
+
 if __name__ == '__main__':
     main()
@@ -1,61 +1,396 @@
-from typing import Any, Callable, Iterable
+from collections import Counter
+from email.message import EmailMessage
+from typing import Any, Callable, Iterable, Iterator
 
 from flight_deals.data_manager import DataManager
 from flight_deals.email_client import EmailClient, make_message
-from flight_deals.flight_data import FlightItinerary
+from flight_deals.email_pool import EmailPool, SendReport
+from flight_deals.flight_data import FlightItinerary, select_cheapest
+from flight_deals.iata_cache import lookup_many
+from flight_deals.itinerary_store import ItineraryStore
+from flight_deals.metrics import metrics
+from flight_deals.price_history import DropDetector, Observation, Route
+from flight_deals.rendering import render_digest_html, render_digest_text
+from flight_deals.scoring import Candidates, ScoringRules, rank
+from flight_deals.search_plan import SearchPlan, SearchQuery
+from flight_deals.sent_index import SentIndex
 
 
+@metrics.timed('stage_duration_seconds', stage='update_destination_codes')
 def update_destination_codes(
-    destinations: DataManager, get_code_fn: Callable[..., str]
+    destinations: DataManager,
+    get_code_fn: Callable[..., str],
+    max_workers: int = 1,
 ) -> None:
-    for row in destinations.data:
-        row['iataCode'] = get_code_fn(row['city'])
+    rows = [
+        row
+        for row in destinations.data
+        if not row.get('iataCode') or destinations.is_changed(row)
+    ]
+    codes = lookup_many(
+        get_code_fn, (row['city'] for row in rows), max_workers
+    )
+    for row in rows:
+        row['iataCode'] = codes[row['city']]
 
     destinations.update_data()
 
 
+def without_price_cap(
+    search_flights_fn: Callable[..., list[dict[str, Any]]]
+) -> Callable[..., list[dict[str, Any]]]:
+    def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+        return search_flights_fn({**query, 'price_to': None})
+
+    return search_flights
+
+
+def make_observation(query: SearchQuery, price: float) -> Observation:
+    return Observation(
+        Route(query['fly_from'], query['fly_to'], query.get('curr', '')),
+        query.get('date_from', ''),
+        query.get('date_to', ''),
+        price,
+    )
+
+
+def pick_deal(
+    query: dict[str, Any],
+    available_flights: list[dict[str, Any]],
+    detector: DropDetector | None = None,
+    observations: list[Observation] | None = None,
+) -> FlightItinerary | None:
+    """Return the cheapest flight if it is a deal.
+
+    With a `detector`, the price observed is appended to `observations` so
+    the caller can record a whole run in one transaction.
+    """
+
+    cheapest = select_cheapest(available_flights)
+    if cheapest is None:
+        return None
+
+    if detector is not None:
+        observation = make_observation(query, float(cheapest['price']))
+        threshold = query.get('price_to')
+        is_deal = (
+            threshold is None
+            or observation.price <= threshold
+            or detector.is_significant_drop(
+                observation.route, observation.price
+            )
+        )
+        if observations is not None:
+            observations.append(observation)
+        if not is_deal:
+            return None
+
+    return FlightItinerary.parse_obj(cheapest)
+
+
+@metrics.timed('stage_duration_seconds', stage='find_cheap_flights_by_origin')
+def find_cheap_flights_by_origin(
+    destinations: DataManager,
+    search_flights_fn: Callable[..., list[dict[str, Any]]],
+    search_params: dict[str, Any],
+    origins: Iterable[str],
+    max_workers: int = 1,
+    store: ItineraryStore | None = None,
+    detector: DropDetector | None = None,
+) -> dict[str, list[FlightItinerary]]:
+
+    if detector is not None:
+        search_flights_fn = without_price_cap(search_flights_fn)
+
+    plan = SearchPlan(origins, destinations.data, search_params)
+    cheap_flights: dict[str, list[FlightItinerary]] = {}
+    observations: list[Observation] = []
+
+    for origin, results in plan.run(search_flights_fn, max_workers).items():
+        cheap_flights[origin] = []
+        for query, available_flights in results:
+            if store is not None:
+                store.extend(available_flights)
+
+            deal = pick_deal(query, available_flights, detector, observations)
+            if deal is not None:
+                cheap_flights[origin].append(deal)
+
+    if detector is not None:
+        detector.history.record_many(observations)
+
+    return cheap_flights
+
+
+def with_drop_threshold(
+    query: SearchQuery,
+    available_flights: list[dict[str, Any]],
+    detector: DropDetector,
+    observations: list[Observation],
+) -> SearchQuery:
+    """Raise the price cap of `query` to the highest price that is a
+    significant drop on its route, and append the cheapest price found to
+    `observations`."""
+
+    cheapest = select_cheapest(available_flights)
+    if cheapest is None:
+        return query
+
+    observation = make_observation(query, float(cheapest['price']))
+    observations.append(observation)
+
+    threshold = detector.drop_threshold(observation.route)
+    price_cap = query.get('price_to')
+    if threshold is None or price_cap is None or threshold <= price_cap:
+        return query
+    return {**query, 'price_to': threshold}
+
+
+@metrics.timed('stage_duration_seconds', stage='rank_cheap_flights_by_origin')
+def rank_cheap_flights_by_origin(
+    destinations: DataManager,
+    search_flights_fn: Callable[..., list[dict[str, Any]]],
+    search_params: dict[str, Any],
+    origins: Iterable[str],
+    max_workers: int = 1,
+    rules: ScoringRules = ScoringRules(),
+    store: ItineraryStore | None = None,
+    detector: DropDetector | None = None,
+) -> dict[str, list[FlightItinerary]]:
+    """Score every itinerary of the run at once and keep, for each query,
+    the best one that passes `rules`, best deals first.
+
+    With a `detector`, the cheapest price of each search is recorded and a
+    significant drop passes the price cap rule.
+    """
+
+    if detector is not None or not rules.within_price_cap:
+        search_flights_fn = without_price_cap(search_flights_fn)
+
+    plan = SearchPlan(origins, destinations.data, search_params)
+    candidates = Candidates()
+    observations: list[Observation] = []
+    for results in plan.run(search_flights_fn, max_workers).values():
+        for query, available_flights in results:
+            if store is not None:
+                store.extend(available_flights)
+            if detector is not None:
+                query = with_drop_threshold(
+                    query, available_flights, detector, observations
+                )
+
+            candidates.add(query, available_flights)
+
+    if detector is not None:
+        detector.history.record_many(observations)
+
+    cheap_flights: dict[str, list[FlightItinerary]] = {
+        origin: [] for origin in plan.origin_keys
+    }
+    for index in rank(candidates, rules):
+        query = candidates.queries[candidates.groups[index]]
+        cheap_flights[query['fly_from']].append(
+            FlightItinerary.parse_obj(candidates.itineraries[index])
+        )
+
+    return cheap_flights
+
+
+def iter_cheap_flights(
+    destinations: DataManager,
+    search_flights_fn: Callable[..., list[dict[str, Any]]],
+    search_params: dict[str, Any],
+    origins: Iterable[str],
+    max_workers: int = 1,
+    store: ItineraryStore | None = None,
+    detector: DropDetector | None = None,
+    flush_every: int = 100,
+) -> Iterator[FlightItinerary]:
+    """Stream the cheapest flight of each search as soon as it is found.
+
+    Observed prices are recorded every `flush_every` searches and when the
+    stream ends.
+    """
+
+    if detector is not None:
+        search_flights_fn = without_price_cap(search_flights_fn)
+
+    plan = SearchPlan(origins, destinations.data, search_params)
+    observations: list[Observation] = []
+
+    try:
+        for query, available_flights in plan.stream(
+            search_flights_fn, max_workers
+        ):
+            if store is not None:
+                store.extend(available_flights)
+
+            deal = pick_deal(query, available_flights, detector, observations)
+            if detector is not None and len(observations) >= flush_every:
+                detector.history.record_many(observations)
+                observations = []
+
+            if deal is not None:
+                yield deal
+    finally:
+        if detector is not None and observations:
+            detector.history.record_many(observations)
+
+
 def find_cheap_flights(
     destinations: DataManager,
     search_flights_fn: Callable[..., list[dict[str, Any]]],
     search_params: dict[str, Any],
+    max_workers: int = 1,
 ) -> list[FlightItinerary]:
 
-    cheap_flights = []
+    origin = search_params['fly_from']
 
-    for row in destinations.data:
-        destination_code = row.get('iataCode', '')
-        if not destination_code:
-            continue
+    return find_cheap_flights_by_origin(
+        destinations, search_flights_fn, search_params, [origin], max_workers
+    )[origin]
 
-        search_params.update(
-            {'fly_to': destination_code, 'price_to': row.get('lowestPrice')}
-        )
 
-        available_flights = search_flights_fn(search_params)
-        if not available_flights:
-            continue
+def make_flight_message(
+    flight: FlightItinerary, sender: str, recipients: str | list[str]
+) -> EmailMessage:
+    return make_message(
+        from_address=sender,
+        to_address=recipients,
+        subject=(
+            f'Low price alert! '
+            f'Only {flight.price} {flight.currency} to fly from '
+            f'{flight.departure_city} to {flight.destination_city}'
+        ),
+        body=str(flight),
+    )
 
-        cheap_flights.append(FlightItinerary.parse_obj(available_flights[0]))
 
-    return cheap_flights
+def make_digest_messages(
+    flights: list[FlightItinerary],
+    sender: str,
+    recipients: Iterable[str | list[str]],
+) -> Iterator[EmailMessage]:
+    """Build one digest message for each entry of `recipients`, rendering
+    the digest only once."""
+
+    cheapest = min(flights, key=lambda flight: flight.price)
+    subject = (
+        f'Low price alert! {len(flights)} cheap flights, '
+        f'from {cheapest.price} {cheapest.currency}'
+    )
+    body = render_digest_text(flights)
+    html_body = render_digest_html(flights)
+
+    for to_address in recipients:
+        yield make_message(
+            from_address=sender,
+            to_address=to_address,
+            subject=subject,
+            body=body,
+            html_body=html_body,
+        )
 
 
+@metrics.timed('stage_duration_seconds', stage='notify')
 def notify(
     flights: Iterable[FlightItinerary],
     email_client: EmailClient,
     sender: str,
     recipients: str | list[str],
+    sent_index: SentIndex | None = None,
 ) -> None:
-    for flight in flights:
-        email_client.send_message(
-            make_message(
-                from_address=sender,
-                to_address=recipients,
-                subject=(
-                    f'Low price alert! '
-                    f'Only {flight.price} {flight.currency} to fly from '
-                    f'{flight.departure_city} to {flight.destination_city}'
-                ),
-                body=str(flight),
+    if sent_index is not None:
+        flights = (
+            flight for flight in flights if not sent_index.was_sent(flight)
+        )
+
+    with email_client:
+        for flight in flights:
+            email_client.send_message(
+                make_flight_message(flight, sender, recipients)
             )
+            if sent_index is not None:
+                sent_index.mark_sent((flight,))
+
+
+@metrics.timed('stage_duration_seconds', stage='notify_digest')
+def notify_digest(
+    flights: Iterable[FlightItinerary],
+    email_client: EmailClient,
+    sender: str,
+    recipients: str | list[str],
+    sent_index: SentIndex | None = None,
+) -> None:
+    flights = [
+        flight
+        for flight in flights
+        if sent_index is None or not sent_index.was_sent(flight)
+    ]
+    if not flights:
+        return
+
+    for msg in make_digest_messages(flights, sender, [recipients]):
+        email_client.send_message(msg)
+    if sent_index is not None:
+        sent_index.mark_sent(flights)
+
+
+@metrics.timed('stage_duration_seconds', stage='notify_each_recipient')
+def notify_each_recipient(
+    flights: Iterable[FlightItinerary],
+    email_pool: EmailPool,
+    sender: str,
+    recipients: list[str],
+    sent_index: SentIndex | None = None,
+    digest: bool = False,
+) -> SendReport:
+    """Send every recipient their own messages, so that no address is
+    shown to the others, through a pool of SMTP connections.
+
+    Flights are marked as sent once at least one recipient got them;
+    those no recipient could be reached for are left to a later run.
+    """
+
+    notified: list[FlightItinerary] = []
+    # Failed messages stay referenced by the report, so their ids are not
+    # reused by later messages before the failures are counted.
+    flights_by_message: dict[int, list[FlightItinerary]] = {}
+    flights = (
+        flight
+        for flight in flights
+        if sent_index is None or not sent_index.was_sent(flight)
+    )
+
+    def make_messages() -> Iterator[EmailMessage]:
+        if digest:
+            notified.extend(flights)
+            if notified:
+                for msg in make_digest_messages(notified, sender, recipients):
+                    flights_by_message[id(msg)] = notified
+                    yield msg
+            return
+
+        for flight in flights:
+            notified.append(flight)
+            for recipient in recipients:
+                msg = make_flight_message(flight, sender, recipient)
+                flights_by_message[id(msg)] = [flight]
+                yield msg
+
+    report = email_pool.send_messages(make_messages())
+    if sent_index is not None:
+        failures = Counter(
+            id(flight)
+            for msg in report.failed_messages
+            for flight in flights_by_message[id(msg)]
         )
+        delivered = [
+            flight
+            for flight in notified
+            if failures[id(flight)] < len(recipients)
+        ]
+        if delivered:
+            sent_index.mark_sent(delivered)
+
+    return report
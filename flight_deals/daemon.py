@@ -0,0 +1,83 @@
+import logging
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Any, Callable
+
+from flight_deals.rate_limit import TokenBucket
+
+SearchFn = Callable[..., list[dict[str, Any]]]
+
+
+class Daemon:
+    """This class is responsible for running a cycle on a fixed schedule
+    until it is stopped.
+
+    A cycle that is running when the daemon is stopped is allowed to
+    finish; `stagger` stops handing out searches as soon as that happens.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self._clock = clock
+        self._stop_event = threading.Event()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _sleep(self, seconds: float) -> None:
+        self._stop_event.wait(seconds)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def install_signal_handlers(self) -> None:
+        def handle_signal(signum: int, frame: FrameType | None) -> None:
+            logging.info(
+                f'Received {signal.Signals(signum).name}, shutting down...'
+            )
+            self.stop()
+
+        signal.signal(signal.SIGTERM, handle_signal)
+        signal.signal(signal.SIGINT, handle_signal)
+
+    def stagger(
+        self, search_flights_fn: SearchFn, searches: int, spread: float
+    ) -> SearchFn:
+        """Space `searches` calls to `search_flights_fn` evenly over
+        `spread` seconds, skipping the remaining ones once stopped."""
+
+        if searches < 1 or spread <= 0:
+            return search_flights_fn
+
+        pacer = TokenBucket(
+            rate=searches / spread,
+            sleep=self._sleep,
+        )
+
+        def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+            pacer.acquire()
+            if self.stopped:
+                return []
+            return search_flights_fn(query)
+
+        return search_flights
+
+    def run_forever(self, run_cycle: Callable[[], None]) -> None:
+        while not self.stopped:
+            started_at = self._clock()
+            try:
+                run_cycle()
+            except Exception:
+                logging.exception('Cycle failed, retrying on schedule.')
+
+            elapsed = self._clock() - started_at
+            self._stop_event.wait(max(self.interval - elapsed, 0.0))
+
+        logging.info('Daemon stopped.')
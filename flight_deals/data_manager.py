@@ -1,22 +1,124 @@
-from typing import Any
+from copy import deepcopy
+from pathlib import Path
 
-from flight_deals.sheet_api import SheetAPI
+from flight_deals.json_file import read_json, write_json
+from flight_deals.sheet_api import (
+    Row,
+    SheetAPI,
+    SheetUpdateError,
+    get_singular_noun,
+)
 
 
 class DataManager:
-    def __init__(self, sheet_name: str, sheet_api: SheetAPI) -> None:
+    def __init__(
+        self,
+        sheet_name: str,
+        sheet_api: SheetAPI,
+        mirror_path: Path | None = None,
+    ) -> None:
         self.sheet_name = sheet_name
         self.sheet_api = sheet_api
-        self.data: list[dict[str, Any]] = []
+        self.mirror_path = mirror_path
+        self.data: list[Row] = []
+        self.changed_ids: set[int] | None = None
+        self._snapshot: dict[int, Row] = {}
+        self._etag: str | None = None
 
     def load_data(self) -> None:
-        self.data = self.sheet_api.get_rows_from_sheet(self.sheet_name)
+        if self.mirror_path is None:
+            self.data = self.sheet_api.get_rows_from_sheet(self.sheet_name)
+        else:
+            self._sync(self.mirror_path)
+
+        self._snapshot = {
+            record['id']: deepcopy(record) for record in self.data
+        }
+
+    def _sync(self, mirror_path: Path) -> None:
+        mirror = read_json(mirror_path, {})
+        mirror_rows: list[Row] | None = mirror.get('rows')
+        # Rows whose changes were not processed yet, None for all of them.
+        pending: list[int] | None = mirror.get('pending', [])
+
+        rows, etag = self.sheet_api.get_rows_if_changed(
+            self.sheet_name,
+            mirror.get('etag') if mirror_rows is not None else None,
+        )
+        if rows is None and mirror_rows is not None:
+            self.data = mirror_rows
+            self.changed_ids = None if pending is None else set(pending)
+            self._etag = mirror.get('etag')
+            return
+
+        self.data = rows or []
+        if mirror_rows is None or pending is None:
+            self.changed_ids = None
+        else:
+            previous = {record['id']: record for record in mirror_rows}
+            self.changed_ids = set(pending) | {
+                record['id']
+                for record in self.data
+                if previous.get(record['id']) != record
+            }
+        self._etag = etag
+        self._write_mirror(mirror_path)
+
+    def _write_mirror(self, mirror_path: Path) -> None:
+        write_json(
+            mirror_path,
+            {
+                'etag': self._etag,
+                'rows': self.data,
+                'pending': (
+                    None
+                    if self.changed_ids is None
+                    else sorted(self.changed_ids)
+                ),
+            },
+        )
+
+    def is_changed(self, record: Row) -> bool:
+        """Tell whether a row changed since the last sync, treating every
+        row as changed when there is no mirror to compare with."""
+
+        return self.changed_ids is None or record['id'] in self.changed_ids
+
+    @property
+    def dirty_data(self) -> list[Row]:
+        return [
+            record
+            for record in self.data
+            if self._snapshot.get(record['id']) != record
+        ]
 
     def update_data(self) -> None:
-        for record in self.data:
-            self.sheet_api.update_sheet_row(
-                sheet_name=self.sheet_name,
-                row_id=record['id'],
-                body=record,
+        """Write the changed rows back to the sheet.
+
+        With a mirror, this also marks the changes found by the last sync
+        as processed, except on the rows that failed to be written.
+        """
+
+        dirty_data = {record['id']: record for record in self.dirty_data}
+        failed: dict[int, Exception] = {}
+        if dirty_data:
+            result = self.sheet_api.update_sheet_rows(
+                sheet_name=self.sheet_name, rows=list(dirty_data.values())
             )
-        self.load_data()
+
+            singular_name = get_singular_noun(self.sheet_name)
+            for row_id, response in result.updated.items():
+                record = dirty_data[row_id]
+                record.update(response.get(singular_name, {}))
+                self._snapshot[row_id] = deepcopy(record)
+
+            failed = result.failed
+            # Our own writes changed the sheet, so the ETag is stale.
+            self._etag = None
+
+        if self.mirror_path is not None:
+            self.changed_ids = set(failed)
+            self._write_mirror(self.mirror_path)
+
+        if failed:
+            raise SheetUpdateError(failed)
@@ -1,5 +1,9 @@
 from email.message import EmailMessage
-from smtplib import SMTP
+from smtplib import SMTP, SMTPServerDisconnected
+from types import TracebackType
+from typing import Iterable
+
+from flight_deals.metrics import metrics
 
 
 def make_message(
@@ -8,6 +12,7 @@ def make_message(
     subject: str = 'No subject',
     body: str = '',
     content_type: str = 'plain',
+    html_body: str | None = None,
 ) -> EmailMessage:
     msg = EmailMessage()
     msg['From'] = from_address
@@ -18,33 +23,111 @@ def make_message(
         raise ValueError(f'{content_type!a} is an unknown content type.')
 
     msg.add_alternative(body, subtype=content_type)
+    if html_body is not None:
+        msg.add_alternative(html_body, subtype='html')
 
     return msg
 
 
 class EmailClient:
+    """This class is responsible for sending emails through an SMTP server.
+
+    Used as a context manager, it keeps one authenticated connection open
+    for every message sent inside the block, reconnecting when the server
+    drops it or after `max_messages_per_connection` messages.
+
+    Without an `address`, the host and port the server was created with are
+    used.
+    """
+
     def __init__(
         self,
         smtp_server: SMTP,
         credentials: tuple[str, str],
+        max_messages_per_connection: int | None = None,
+        address: tuple[str, int] | None = None,
     ):
         self._server = smtp_server
-        host, port = str(getattr(smtp_server, '_host')).split(':')
-        self._host = host
-        self._port = int(port)
+        if address is None:
+            host, port = str(getattr(smtp_server, '_host')).split(':')
+            address = host, int(port)
+        else:
+            # STARTTLS sends the host SMTP was created with as the TLS
+            # server name, which a server created without one lacks.
+            setattr(smtp_server, '_host', address[0])
+        self._host, self._port = address
         self._login, self._password = credentials
+        self._max_messages_per_connection = max_messages_per_connection
+        self._in_session = False
+        self._connected = False
+        self._sent_on_connection = 0
 
     def _connect(self) -> None:
         self._server.connect(self._host, self._port)
         self._server.starttls()
         self._server.login(self._login, self._password)
+        metrics.increment('smtp_connections_total')
+        self._connected = True
+        self._sent_on_connection = 0
 
     def _quit(self) -> None:
-        self._server.quit()
+        self._connected = False
+        try:
+            self._server.quit()
+        except SMTPServerDisconnected:
+            pass
+
+    def _sendmail(self, msg: EmailMessage) -> None:
+        content = msg.as_string()
+        with metrics.timer('smtp_send_duration_seconds'):
+            self._server.sendmail(
+                from_addr=msg['From'], to_addrs=msg['To'], msg=content
+            )
+        metrics.increment('smtp_sent_bytes_total', len(content))
+
+    def _send_in_session(self, msg: EmailMessage) -> None:
+        if (
+            self._connected
+            and self._max_messages_per_connection is not None
+            and self._sent_on_connection >= self._max_messages_per_connection
+        ):
+            self._quit()
+
+        if not self._connected:
+            self._connect()
+
+        try:
+            self._sendmail(msg)
+        except SMTPServerDisconnected:
+            self._connect()
+            self._sendmail(msg)
+
+        self._sent_on_connection += 1
 
     def send_message(self, msg: EmailMessage) -> None:
+        if self._in_session:
+            self._send_in_session(msg)
+            return
+
         self._connect()
-        self._server.sendmail(
-            from_addr=msg['From'], to_addrs=msg['To'], msg=msg.as_string()
-        )
+        self._sendmail(msg)
         self._quit()
+
+    def send_messages(self, msgs: Iterable[EmailMessage]) -> None:
+        with self:
+            for msg in msgs:
+                self.send_message(msg)
+
+    def __enter__(self) -> 'EmailClient':
+        self._in_session = True
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._in_session = False
+        if self._connected:
+            self._quit()
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from smtplib import SMTPException, SMTPRecipientsRefused, SMTPResponseException
+from typing import Callable, Iterable
+
+from flight_deals.email_client import EmailClient
+from flight_deals.rate_limit import backoff_delay
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    if isinstance(error, SMTPRecipientsRefused):
+        return True
+    if isinstance(error, SMTPResponseException):
+        return error.smtp_code >= 500
+    return not isinstance(error, (SMTPException, OSError))
+
+
+@dataclass
+class SendReport:
+    sent: int = 0
+    retries: int = 0
+    failed: list[tuple[str, Exception]] = field(default_factory=list)
+    failed_messages: list[EmailMessage] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f'{self.sent} sent, {len(self.failed)} failed, '
+            f'{self.retries} retries in {self.elapsed:.2f}s '
+            f'({self.messages_per_second:.1f} messages/s)'
+        )
+
+
+class EmailPool:
+    """This class is responsible for sending messages concurrently over
+    `size` SMTP connections fed from a single work queue.
+
+    Each worker keeps one `EmailClient` session open, so the per-connection
+    message cap of the clients applies. A message that fails with a
+    transient error is retried by the same worker; one that still fails,
+    or is refused, is reported without affecting the others. So are the
+    messages left once no worker could create its client.
+    """
+
+    def __init__(
+        self,
+        make_client: Callable[[], EmailClient],
+        size: int = 4,
+        max_retries: int = 2,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.make_client = make_client
+        self.size = size
+        self.max_retries = max_retries
+        self._sleep = sleep
+
+    @staticmethod
+    def _fail(
+        msg: EmailMessage,
+        error: Exception,
+        report: SendReport,
+        lock: threading.Lock,
+    ) -> None:
+        logging.warning(f'Failed to email {msg["To"]}: {error!r}')
+        with lock:
+            report.failed.append((str(msg['To']), error))
+            report.failed_messages.append(msg)
+
+    def _send(
+        self,
+        client: EmailClient,
+        msg: EmailMessage,
+        report: SendReport,
+        lock: threading.Lock,
+    ) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                client.send_message(msg)
+            except Exception as error:
+                if is_permanent_failure(error) or attempt == self.max_retries:
+                    self._fail(msg, error, report, lock)
+                    return
+
+                with lock:
+                    report.retries += 1
+                self._sleep(backoff_delay(attempt))
+            else:
+                with lock:
+                    report.sent += 1
+                return
+
+    def _work(
+        self,
+        messages: 'queue.Queue[EmailMessage | None]',
+        report: SendReport,
+        lock: threading.Lock,
+        workers_left: list[int],
+    ) -> None:
+        try:
+            client = self.make_client()
+        except Exception as error:
+            logging.warning(f'Failed to create an email client: {error!r}')
+            with lock:
+                workers_left[0] -= 1
+                is_last = not workers_left[0]
+            # The last worker fails the remaining messages, so the queue
+            # never fills up with nobody left to empty it.
+            if is_last:
+                while (msg := messages.get()) is not None:
+                    self._fail(msg, error, report, lock)
+            return
+
+        with client:
+            while (msg := messages.get()) is not None:
+                self._send(client, msg, report, lock)
+
+    def send_messages(self, msgs: Iterable[EmailMessage]) -> SendReport:
+        report = SendReport()
+        lock = threading.Lock()
+        messages: 'queue.Queue[EmailMessage | None]' = queue.Queue(
+            maxsize=2 * self.size
+        )
+        workers_left = [self.size]
+        workers = [
+            threading.Thread(
+                target=self._work,
+                args=(messages, report, lock, workers_left),
+                daemon=True,
+            )
+            for _ in range(self.size)
+        ]
+
+        started_at = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        try:
+            for msg in msgs:
+                messages.put(msg)
+        finally:
+            for _ in workers:
+                messages.put(None)
+            for worker in workers:
+                worker.join()
+        report.elapsed = time.perf_counter() - started_at
+
+        return report
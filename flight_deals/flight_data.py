@@ -1,9 +1,11 @@
 from datetime import datetime
 from decimal import Decimal
-from itertools import dropwhile, takewhile
+from itertools import takewhile
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from flight_deals.rendering import render_flight_text, render_itinerary_text
 
 
 class Flight(BaseModel):
@@ -19,24 +21,19 @@ class Flight(BaseModel):
     arrival_datetime: datetime = Field(..., alias='local_arrival')
     is_return: bool = Field(..., alias='return')
 
+    class Config:
+        allow_mutation = False
+
     def __str__(self) -> str:
-        title = (
-            '{departure_city} ({departure_city_code})'
-            ' ==> '
-            '{arrival_city} ({arrival_city_code})'
-        )
-
-        return '\n'.join(
-            (
-                title,
-                'Departure on: {departure_datetime:%d/%m/%Y %H:%M:%S}',
-                'Arrival on: {arrival_datetime:%d/%m/%Y %H:%M:%S}',
-            )
-        ).format(**self.dict())
+        return render_flight_text(self)
 
 
 class FlightItinerary(BaseModel):
-    """This class represents flight itinerary data."""
+    """This class represents flight itinerary data.
+
+    Route legs are kept as the raw API dicts and only validated into
+    `Flight` models the first time `route` is read.
+    """
 
     departure_city: str = Field(..., alias='cityFrom')
     departure_city_code: str = Field(..., alias='cityCodeFrom')
@@ -45,33 +42,68 @@ class FlightItinerary(BaseModel):
     price: Decimal
     conversion: dict[str, Any]
     days_of_stay: int = Field(..., alias='nightsInDest')
-    route: list[Flight] = Field(..., min_items=2)
+    raw_route: list[dict[str, Any]] = Field(..., alias='route', min_items=2)
+
+    _route: list[Flight] | None = PrivateAttr(None)
+    _split_route: tuple[list[Flight], list[Flight]] | None = PrivateAttr(None)
+    _rendered: dict[str, str] = PrivateAttr(default_factory=dict)
+
+    # The route and rendered text are cached, so fields are frozen.
+    class Config:
+        allow_mutation = False
 
     @property
     def currency(self) -> str:
         return next(iter(self.conversion))
 
+    @property
+    def route(self) -> list[Flight]:
+        if self._route is None:
+            self._route = list(map(Flight.parse_obj, self.raw_route))
+
+        return self._route
+
+    def _get_split_route(self) -> tuple[list[Flight], list[Flight]]:
+        if self._split_route is None:
+            departing_route = list(
+                takewhile(lambda flight: not flight.is_return, self.route)
+            )
+            self._split_route = (
+                departing_route,
+                self.route[len(departing_route) :],
+            )
+
+        return self._split_route
+
     @property
     def departing_route(self) -> list[Flight]:
-        return list(takewhile(lambda flight: not flight.is_return, self.route))
+        return self._get_split_route()[0]
 
     @property
     def return_route(self) -> list[Flight]:
-        return list(dropwhile(lambda flight: not flight.is_return, self.route))
+        return self._get_split_route()[1]
+
+    def copy(self, **kwargs: Any) -> 'FlightItinerary':
+        # The copy may update fields, so it starts with empty caches
+        # instead of sharing those of this itinerary.
+        itinerary = super().copy(**kwargs)
+        itinerary._init_private_attributes()
+        return itinerary
 
     def __str__(self) -> str:
-        details = (
-            f'{self.departure_city} ({self.departure_city_code})'
-            ' ==> '
-            f'{self.destination_city} ({self.destination_city_code})\n'
-            f'Price: {self.price:.2f} {self.currency}\n'
-            f'Stay: {self.days_of_stay} days'
-        )
-
-        for type_route, flights in (
-            ('>>> Departing', self.departing_route),
-            ('<<< Returning', self.return_route),
-        ):
-            details += '\n\n'.join((f'\n\n{type_route}:', *map(str, flights)))
-
-        return details
+        return render_itinerary_text(self)
+
+
+def raw_price(itinerary: dict[str, Any]) -> Decimal:
+    return Decimal(str(itinerary.get('price', 'Infinity')))
+
+
+def select_cheapest(
+    itineraries: list[dict[str, Any]]
+) -> dict[str, Any] | None:
+    """Pick the cheapest raw itinerary without validating any of them."""
+
+    if not itineraries:
+        return None
+
+    return min(itineraries, key=raw_price)
@@ -1,3 +1,4 @@
+import time
 from typing import Any
 from urllib.parse import urljoin
 
@@ -6,11 +7,20 @@ from pydantic import (
     BaseModel,
     Field,
     HttpUrl,
+    NonNegativeFloat,
+    NonNegativeInt,
     PositiveInt,
     SecretStr,
     validate_arguments,
 )
 
+from flight_deals.http_session import HTTPClient
+from flight_deals.metrics import metrics
+from flight_deals.rate_limit import TokenBucket, backoff_delay
+from flight_deals.search_cache import SearchCache, make_cache_key
+
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
 
 class FlightSearchParams(BaseModel):
     fly_from: str
@@ -28,13 +38,27 @@ class FlightSearchParams(BaseModel):
     limit: PositiveInt = 10
 
 
-class FlightSearch:
+class FlightSearch(HTTPClient):
     """This class is responsible for talking to the Flight Search API."""
 
-    @validate_arguments
-    def __init__(self, base_url: HttpUrl, api_key: SecretStr) -> None:
+    @validate_arguments(config={'arbitrary_types_allowed': True})
+    def __init__(
+        self,
+        base_url: HttpUrl,
+        api_key: SecretStr,
+        session: requests.Session | None = None,
+        rate_limiter: TokenBucket | None = None,
+        max_retries: NonNegativeInt = 3,
+        cache: SearchCache | None = None,
+        max_retry_after: NonNegativeFloat = 300.0,
+    ) -> None:
+        super().__init__(session)
         self.base_url = base_url
         self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.cache = cache
+        self.max_retry_after = max_retry_after
 
     @property
     def headers(self) -> dict[str, Any]:
@@ -43,6 +67,38 @@ class FlightSearch:
             'Content-Type': 'application/json',
         }
 
+    def _get(self, path: str, params: dict[str, Any]) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            response = self.session.get(
+                url=urljoin(self.base_url, path),
+                headers=self.headers,
+                params=params,
+            )
+            if (
+                response.status_code not in RETRY_STATUS_CODES
+                or attempt == self.max_retries
+            ):
+                break
+
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            # Waiting that long would stall every search sharing the limiter.
+            if delay > self.max_retry_after:
+                break
+
+            metrics.increment(
+                'flight_api_retries_total', status=response.status_code
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+        response.raise_for_status()
+        return response
+
     @validate_arguments
     def get_iata_code_by_city_name(self, city_name: str) -> str:
         params: dict[str, int | str] = {
@@ -50,12 +106,7 @@ class FlightSearch:
             'location_types': 'city',
             'limit': 1,
         }
-        response = requests.get(
-            url=urljoin(self.base_url, 'locations/query'),
-            headers=self.headers,
-            params=params,
-        )
-        response.raise_for_status()
+        response = self._get('locations/query', params)
 
         locations = response.json().get('locations')
         if (
@@ -70,13 +121,23 @@ class FlightSearch:
     def search_flights(
         self, flight_params: FlightSearchParams
     ) -> list[dict[str, Any]]:
-        response = requests.get(
-            url=urljoin(self.base_url, 'v2/search'),
-            headers=self.headers,
-            params=flight_params.dict(),
-        )
-        response.raise_for_status()
+        if self.cache is None:
+            return self._search_flights(flight_params)
 
-        data = response.json().get('data', [])
+        cache_key = make_cache_key(flight_params)
+        data = self.cache.get(cache_key)
+        if data is None:
+            metrics.increment('search_cache_requests_total', result='miss')
+            data = self._search_flights(flight_params)
+            self.cache.set(cache_key, data)
+        else:
+            metrics.increment('search_cache_requests_total', result='hit')
 
         return data
+
+    def _search_flights(
+        self, flight_params: FlightSearchParams
+    ) -> list[dict[str, Any]]:
+        response = self._get('v2/search', flight_params.dict())
+
+        return response.json().get('data', [])
@@ -0,0 +1,75 @@
+from types import TracebackType
+from typing import Any, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from flight_deals.metrics import metrics
+
+HTTPClientT = TypeVar('HTTPClientT', bound='HTTPClient')
+
+
+def record_response(response: requests.Response, **kwargs: Any) -> None:
+    if not metrics.enabled:
+        return
+
+    labels = {
+        'host': urlsplit(response.url).netloc,
+        'method': response.request.method,
+    }
+    metrics.observe(
+        'http_request_duration_seconds',
+        response.elapsed.total_seconds(),
+        status=response.status_code,
+        **labels,
+    )
+    metrics.increment(
+        'http_response_bytes_total', len(response.content), **labels
+    )
+
+
+def make_session(
+    pool_connections: int = 10, pool_maxsize: int = 10
+) -> requests.Session:
+    """Create a keep-alive session with at most `pool_maxsize` connections
+    per host, keeping pools for up to `pool_connections` hosts.
+
+    Every response is recorded in `flight_deals.metrics` when enabled."""
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+    )
+    session = requests.Session()
+    session.hooks['response'].append(record_response)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class HTTPClient:
+    """Base class for clients that talk HTTP through a pooled session.
+
+    A session passed in is shared and left open for its owner to close.
+    """
+
+    def __init__(self, session: requests.Session | None = None) -> None:
+        self._owns_session = session is None
+        self.session = make_session() if session is None else session
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self: HTTPClientT) -> HTTPClientT:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
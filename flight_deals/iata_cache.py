@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import Callable, Iterable
+
+from flight_deals.json_file import read_json, write_json
+from flight_deals.metrics import metrics
+
+DAY = 24 * 60 * 60
+
+
+def normalize_city_name(city_name: str) -> str:
+    return ' '.join(city_name.split()).casefold()
+
+
+def lookup_many(
+    get_code_fn: Callable[[str], str],
+    city_names: Iterable[str],
+    max_workers: int = 1,
+) -> dict[str, str]:
+    """Look up each distinct city once, up to `max_workers` at a time, and
+    map every given name to its code."""
+
+    unique_names: dict[str, str] = {}
+    city_names = list(city_names)
+    for city_name in city_names:
+        unique_names.setdefault(normalize_city_name(city_name), city_name)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        codes = dict(
+            zip(unique_names, executor.map(get_code_fn, unique_names.values()))
+        )
+
+    return {
+        city_name: codes[normalize_city_name(city_name)]
+        for city_name in city_names
+    }
+
+
+class IATACodeCache:
+    """This class is responsible for keeping resolved IATA codes on disk.
+
+    Cities without a match are cached as an empty code, usually with a
+    shorter TTL so that they are looked up again sooner. Concurrent misses
+    for the same city share a single lookup.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 30 * DAY,
+        negative_ttl: float = DAY,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: dict[str, tuple[str, float]] = self._read()
+        self._in_flight: dict[str, Future[str]] = {}
+
+    def _read(self) -> dict[str, tuple[str, float]]:
+        return {
+            city: (code, expires_at)
+            for city, (code, expires_at) in read_json(self.path, {}).items()
+        }
+
+    def _get_fresh(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def _set(self, key: str, code: str) -> None:
+        ttl = self.ttl if code else self.negative_ttl
+        self._entries[key] = (code, self._clock() + ttl)
+        self._dirty = True
+
+    def get(self, city_name: str) -> str | None:
+        key = normalize_city_name(city_name)
+        with self._lock:
+            code = self._get_fresh(key)
+            if code is None:
+                self.misses += 1
+                metrics.increment('iata_cache_requests_total', result='miss')
+                return None
+
+            self.hits += 1
+            metrics.increment('iata_cache_requests_total', result='hit')
+            return code
+
+    def set(self, city_name: str, code: str) -> None:
+        with self._lock:
+            self._set(normalize_city_name(city_name), code)
+
+    def _lookup(
+        self, city_name: str, get_code_fn: Callable[[str], str]
+    ) -> str:
+        key = normalize_city_name(city_name)
+        with self._lock:
+            # The lookup may have finished since the caller missed.
+            code = self._get_fresh(key)
+            if code is not None:
+                return code
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                future: Future[str] = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+                metrics.increment(
+                    'iata_cache_requests_total', result='coalesced'
+                )
+
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            code = get_code_fn(city_name)
+        except BaseException as error:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(error)
+            raise
+
+        with self._lock:
+            self._set(key, code)
+            del self._in_flight[key]
+        future.set_result(code)
+        return code
+
+    def cached(
+        self, get_code_fn: Callable[[str], str]
+    ) -> Callable[[str], str]:
+        def get_code(city_name: str) -> str:
+            code = self.get(city_name)
+            if code is None:
+                code = self._lookup(city_name, get_code_fn)
+            return code
+
+        return get_code
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+
+            now = self._clock()
+            entries = {
+                city: entry
+                for city, entry in self._entries.items()
+                if entry[1] > now
+            }
+            write_json(self.path, entries)
+            self._dirty = False
+
+    def __enter__(self) -> 'IATACodeCache':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.save()
@@ -0,0 +1,228 @@
+import csv
+import io
+import sys
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+
+from flight_deals.flight_data import Flight, FlightItinerary
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(str(value))
+
+
+def _parse_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+class CompactFlight:
+    """This class represents a single flight leg with minimal memory."""
+
+    __slots__ = (
+        'departure_location_code',
+        'departure_city',
+        'departure_city_code',
+        'arrival_location_code',
+        'arrival_city',
+        'arrival_city_code',
+        'departure_datetime',
+        'arrival_datetime',
+        'is_return',
+    )
+
+    def __init__(
+        self,
+        departure_location_code: str,
+        departure_city: str,
+        departure_city_code: str,
+        arrival_location_code: str,
+        arrival_city: str,
+        arrival_city_code: str,
+        departure_datetime: datetime,
+        arrival_datetime: datetime,
+        is_return: bool,
+    ) -> None:
+        self.departure_location_code = _intern(departure_location_code)
+        self.departure_city = _intern(departure_city)
+        self.departure_city_code = _intern(departure_city_code)
+        self.arrival_location_code = _intern(arrival_location_code)
+        self.arrival_city = _intern(arrival_city)
+        self.arrival_city_code = _intern(arrival_city_code)
+        self.departure_datetime = departure_datetime
+        self.arrival_datetime = arrival_datetime
+        self.is_return = is_return
+
+    @classmethod
+    def from_raw(cls, data: dict[str, Any]) -> 'CompactFlight':
+        return cls(
+            departure_location_code=data['flyFrom'],
+            departure_city=data['cityFrom'],
+            departure_city_code=data['cityCodeFrom'],
+            arrival_location_code=data['flyTo'],
+            arrival_city=data['cityTo'],
+            arrival_city_code=data['cityCodeTo'],
+            departure_datetime=_parse_datetime(data['local_departure']),
+            arrival_datetime=_parse_datetime(data['local_arrival']),
+            is_return=bool(data['return']),
+        )
+
+    @classmethod
+    def from_model(cls, flight: Flight) -> 'CompactFlight':
+        return cls(**{name: getattr(flight, name) for name in cls.__slots__})
+
+    def to_raw(self) -> dict[str, Any]:
+        return {
+            'flyFrom': self.departure_location_code,
+            'cityFrom': self.departure_city,
+            'cityCodeFrom': self.departure_city_code,
+            'flyTo': self.arrival_location_code,
+            'cityTo': self.arrival_city,
+            'cityCodeTo': self.arrival_city_code,
+            'local_departure': self.departure_datetime,
+            'local_arrival': self.arrival_datetime,
+            'return': self.is_return,
+        }
+
+    def to_model(self) -> Flight:
+        return Flight.parse_obj(self.to_raw())
+
+
+class CompactItinerary:
+    """This class represents a flight itinerary with minimal memory.
+
+    Only the price in the itinerary currency is kept from `conversion`.
+    """
+
+    __slots__ = (
+        'departure_city',
+        'departure_city_code',
+        'destination_city',
+        'destination_city_code',
+        'price',
+        'currency',
+        'days_of_stay',
+        'route',
+    )
+
+    def __init__(
+        self,
+        departure_city: str,
+        departure_city_code: str,
+        destination_city: str,
+        destination_city_code: str,
+        price: Decimal,
+        currency: str,
+        days_of_stay: int,
+        route: tuple[CompactFlight, ...],
+    ) -> None:
+        self.departure_city = _intern(departure_city)
+        self.departure_city_code = _intern(departure_city_code)
+        self.destination_city = _intern(destination_city)
+        self.destination_city_code = _intern(destination_city_code)
+        self.price = price
+        self.currency = _intern(currency)
+        self.days_of_stay = days_of_stay
+        self.route = route
+
+    @classmethod
+    def from_raw(cls, data: dict[str, Any]) -> 'CompactItinerary':
+        return cls(
+            departure_city=data['cityFrom'],
+            departure_city_code=data['cityCodeFrom'],
+            destination_city=data['cityTo'],
+            destination_city_code=data['cityCodeTo'],
+            price=Decimal(str(data['price'])),
+            currency=next(iter(data['conversion'])),
+            days_of_stay=data['nightsInDest'],
+            route=tuple(map(CompactFlight.from_raw, data['route'])),
+        )
+
+    @classmethod
+    def from_model(cls, itinerary: FlightItinerary) -> 'CompactItinerary':
+        return cls(
+            departure_city=itinerary.departure_city,
+            departure_city_code=itinerary.departure_city_code,
+            destination_city=itinerary.destination_city,
+            destination_city_code=itinerary.destination_city_code,
+            price=itinerary.price,
+            currency=itinerary.currency,
+            days_of_stay=itinerary.days_of_stay,
+            route=tuple(map(CompactFlight.from_model, itinerary.route)),
+        )
+
+    def to_raw(self) -> dict[str, Any]:
+        return {
+            'cityFrom': self.departure_city,
+            'cityCodeFrom': self.departure_city_code,
+            'cityTo': self.destination_city,
+            'cityCodeTo': self.destination_city_code,
+            'price': self.price,
+            'conversion': {self.currency: self.price},
+            'nightsInDest': self.days_of_stay,
+            'route': [flight.to_raw() for flight in self.route],
+        }
+
+    def to_model(self) -> FlightItinerary:
+        return FlightItinerary.parse_obj(self.to_raw())
+
+
+CSV_COLUMNS = (
+    'departure_city_code',
+    'destination_city_code',
+    'departure_datetime',
+    'days_of_stay',
+    'legs',
+    'price',
+    'currency',
+)
+
+
+class ItineraryStore:
+    """This class is responsible for keeping every itinerary of a run."""
+
+    def __init__(self) -> None:
+        self._itineraries: list[CompactItinerary] = []
+
+    def __len__(self) -> int:
+        return len(self._itineraries)
+
+    def __iter__(self) -> Iterator[CompactItinerary]:
+        return iter(self._itineraries)
+
+    def add(self, itinerary: FlightItinerary | dict[str, Any]) -> None:
+        if isinstance(itinerary, FlightItinerary):
+            self._itineraries.append(CompactItinerary.from_model(itinerary))
+        else:
+            self._itineraries.append(CompactItinerary.from_raw(itinerary))
+
+    def extend(
+        self, itineraries: Iterable[FlightItinerary | dict[str, Any]]
+    ) -> None:
+        for itinerary in itineraries:
+            self.add(itinerary)
+
+    def to_models(self) -> Iterator[FlightItinerary]:
+        return (itinerary.to_model() for itinerary in self._itineraries)
+
+    def to_csv(self) -> str:
+        """Return one CSV row per itinerary, for analytics."""
+
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerow(CSV_COLUMNS)
+        for itinerary in self._itineraries:
+            writer.writerow(
+                (
+                    itinerary.departure_city_code,
+                    itinerary.destination_city_code,
+                    itinerary.route[0].departure_datetime.isoformat(),
+                    itinerary.days_of_stay,
+                    len(itinerary.route),
+                    itinerary.price,
+                    itinerary.currency,
+                )
+            )
+        return output.getvalue()
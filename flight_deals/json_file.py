@@ -0,0 +1,28 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    try:
+        with path.open(encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+
+
+def write_text(path: Path, text: str) -> None:
+    """Write `text` to a temporary file and move it over `path`, so
+    readers never see a partially written file."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path: Path, data: Any) -> None:
+    write_text(path, json.dumps(data, ensure_ascii=False))
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+F = TypeVar('F', bound=Callable[..., Any])
+Labels = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    __slots__ = ('bucket_counts', 'count', 'sum')
+
+    def __init__(self, buckets: int) -> None:
+        self.bucket_counts = [0] * (buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+def _make_labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels)
+    return f'{{{pairs}}}' if pairs else ''
+
+
+class Metrics:
+    """This class is responsible for collecting counters and latency
+    histograms for a run.
+
+    Every method returns immediately while the registry is disabled.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def increment(self, name: str, amount: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+
+        key = _make_labels(labels)
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+
+        key = _make_labels(labels)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(len(self.buckets))
+            histogram.bucket_counts[bisect_left(self.buckets, value)] += 1
+            histogram.count += 1
+            histogram.sum += value
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def timed(self, name: str, **labels: Any) -> Callable[[F], F]:
+        def decorator(fn: F) -> F:
+            @wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for name, counters in self._counters.items()
+                    for labels, value in counters.items()
+                ],
+                'histograms': [
+                    {
+                        'name': name,
+                        'labels': dict(labels),
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'buckets': dict(
+                            zip(
+                                (*map(str, self.buckets), '+Inf'),
+                                histogram.bucket_counts,
+                            )
+                        ),
+                    }
+                    for name, histograms in self._histograms.items()
+                    for labels, histogram in histograms.items()
+                ],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, counters in self._counters.items():
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(
+                    f'{name}{_format_labels(labels)} {value}'
+                    for labels, value in counters.items()
+                )
+
+            for name, histograms in self._histograms.items():
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in histograms.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(
+                        (*map(str, self.buckets), '+Inf'),
+                        histogram.bucket_counts,
+                    ):
+                        cumulative += bucket_count
+                        bucket_labels = _format_labels(
+                            (*labels, ('le', bound))
+                        )
+                        lines.append(
+                            f'{name}_bucket{bucket_labels} {cumulative}'
+                        )
+                    lines.append(
+                        f'{name}_sum{_format_labels(labels)} {histogram.sum}'
+                    )
+                    lines.append(
+                        f'{name}_count{_format_labels(labels)} '
+                        f'{histogram.count}'
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
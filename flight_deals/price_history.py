@@ -0,0 +1,151 @@
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Callable, Iterable, NamedTuple
+
+DAY = 24 * 60 * 60
+
+
+class Route(NamedTuple):
+    fly_from: str
+    fly_to: str
+    currency: str
+
+
+class Observation(NamedTuple):
+    route: Route
+    date_from: str
+    date_to: str
+    price: float
+
+
+class PriceStats(NamedTuple):
+    samples: int
+    mean: float
+    stddev: float
+    minimum: float | None
+
+
+class PriceHistory:
+    """This class is responsible for storing every observed flight price.
+
+    Observations are indexed by route, currency and time so window
+    queries read a contiguous range of a covering index.
+    """
+
+    def __init__(
+        self, path: Path, clock: Callable[[], float] = time.time
+    ) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.execute('PRAGMA synchronous = NORMAL')
+        with self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS observations (
+                    fly_from TEXT NOT NULL,
+                    fly_to TEXT NOT NULL,
+                    currency TEXT NOT NULL,
+                    date_from TEXT NOT NULL,
+                    date_to TEXT NOT NULL,
+                    price REAL NOT NULL,
+                    observed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS observations_route
+                    ON observations (
+                        fly_from, fly_to, currency, observed_at, price
+                    );
+                """
+            )
+
+    def record_many(self, observations: Iterable[Observation]) -> None:
+        now = self._clock()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (*route, date_from, date_to, price, now)
+                    for route, date_from, date_to, price in observations
+                ),
+            )
+
+    def record(self, observation: Observation) -> None:
+        self.record_many((observation,))
+
+    def price_stats(self, route: Route, days: float) -> PriceStats:
+        with self._lock:
+            count, mean, mean_of_squares, minimum = self._connection.execute(
+                """
+                SELECT COUNT(*), AVG(price), AVG(price * price), MIN(price)
+                FROM observations
+                WHERE fly_from = ? AND fly_to = ? AND currency = ?
+                    AND observed_at >= ?
+                """,
+                (*route, self._clock() - days * DAY),
+            ).fetchone()
+
+        if not count:
+            return PriceStats(0, 0.0, 0.0, None)
+
+        variance = max(mean_of_squares - mean * mean, 0.0)
+        return PriceStats(count, mean, math.sqrt(variance), minimum)
+
+    def best_price(self, route: Route, days: float) -> float | None:
+        return self.price_stats(route, days).minimum
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'PriceHistory':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class DropDetector:
+    """This class is responsible for flagging significant price drops.
+
+    A price is a significant drop when it sits at least `z_score`
+    standard deviations below the mean of the last `window_days`.
+    """
+
+    def __init__(
+        self,
+        history: PriceHistory,
+        window_days: float = 30,
+        min_samples: int = 5,
+        z_score: float = 2.0,
+    ) -> None:
+        self.history = history
+        self.window_days = window_days
+        self.min_samples = min_samples
+        self.z_score = z_score
+
+    def drop_threshold(self, route: Route) -> float | None:
+        """Return the highest price that is a significant drop, or None
+        while the route has too few samples."""
+
+        stats = self.history.price_stats(route, self.window_days)
+        if stats.samples < self.min_samples:
+            return None
+
+        if stats.stddev == 0:
+            return math.nextafter(stats.mean, -math.inf)
+
+        return stats.mean - self.z_score * stats.stddev
+
+    def is_significant_drop(self, route: Route, price: float) -> bool:
+        threshold = self.drop_threshold(route)
+        return threshold is not None and price <= threshold
@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+
+class TokenBucket:
+    """This class is responsible for limiting the rate of requests.
+
+    Tokens are reserved under a lock and waited for outside of it, so
+    concurrent callers are served in arrival order. While paused, the
+    bucket neither refills nor serves anyone.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1.')
+
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        # Lies in the future while paused.
+        self._updated_at = clock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated_at, 0.0)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = max(self._updated_at, now)
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = (self._updated_at - now) + max(
+                -self._tokens / self.rate, 0.0
+            )
+
+        if wait:
+            self._sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for `seconds`, e.g. after a 429, then
+        serve them at `rate` from an empty bucket."""
+
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated_at = max(self._updated_at, now + seconds)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: str | None = None,
+    base: float = 0.5,
+    cap: float = 60.0,
+) -> float:
+    """Honour `Retry-After` when given, else use full-jitter exponential
+    backoff capped at `cap` seconds.
+
+    The server's delay is not capped: retrying before it would only earn
+    another 429 and use up an attempt. Callers should give up instead when
+    it is too long to wait.
+    """
+
+    delay = parse_retry_after(retry_after)
+    if delay is not None:
+        return delay
+
+    return random.uniform(0, min(cap, base * 2**attempt))
@@ -0,0 +1,108 @@
+from html import escape
+from typing import TYPE_CHECKING, Callable, Iterable
+
+# Only needed for annotations; flight_data imports this module to render.
+if TYPE_CHECKING:
+    from flight_deals.flight_data import Flight, FlightItinerary
+
+# Templates are built once and read model attributes directly, so rendering
+# neither copies the model into a dict nor re-parses the template text.
+_FLIGHT_TEXT = (
+    '{0.departure_city} ({0.departure_city_code})'
+    ' ==> '
+    '{0.arrival_city} ({0.arrival_city_code})\n'
+    'Departure on: {0.departure_datetime:%d/%m/%Y %H:%M:%S}\n'
+    'Arrival on: {0.arrival_datetime:%d/%m/%Y %H:%M:%S}'
+).format
+_ITINERARY_HEADER_TEXT = (
+    '{0.departure_city} ({0.departure_city_code})'
+    ' ==> '
+    '{0.destination_city} ({0.destination_city_code})\n'
+    'Price: {0.price:.2f} {1}\n'
+    'Stay: {0.days_of_stay} days'
+).format
+_ITINERARY_HTML = '<pre>{0}</pre>'.format
+
+
+def render_flight_text(flight: 'Flight') -> str:
+    return _FLIGHT_TEXT(flight)
+
+
+def _memoized(
+    itinerary: 'FlightItinerary',
+    kind: str,
+    render: Callable[['FlightItinerary'], str],
+) -> str:
+    rendered = itinerary._rendered
+    if kind not in rendered:
+        rendered[kind] = render(itinerary)
+    return rendered[kind]
+
+
+def _render_itinerary_text(itinerary: 'FlightItinerary') -> str:
+    return '\n\n'.join(
+        (
+            _ITINERARY_HEADER_TEXT(itinerary, itinerary.currency),
+            '>>> Departing:',
+            *map(_FLIGHT_TEXT, itinerary.departing_route),
+            '<<< Returning:',
+            *map(_FLIGHT_TEXT, itinerary.return_route),
+        )
+    )
+
+
+def render_itinerary_text(itinerary: 'FlightItinerary') -> str:
+    """Render an itinerary as plain text, once per itinerary."""
+
+    return _memoized(itinerary, 'text', _render_itinerary_text)
+
+
+def render_itinerary_html(itinerary: 'FlightItinerary') -> str:
+    return _memoized(
+        itinerary,
+        'html',
+        lambda itinerary: _ITINERARY_HTML(
+            escape(render_itinerary_text(itinerary))
+        ),
+    )
+
+
+def group_by_destination(
+    flights: 'Iterable[FlightItinerary]',
+) -> 'dict[str, list[FlightItinerary]]':
+    """Group flights by destination, cheapest destinations and flights
+    first."""
+
+    sections: dict[str, list[FlightItinerary]] = {}
+    for flight in sorted(flights, key=lambda flight: flight.price):
+        destination = (
+            f'{flight.destination_city} ({flight.destination_city_code})'
+        )
+        sections.setdefault(destination, []).append(flight)
+
+    return sections
+
+
+def render_digest_text(flights: 'Iterable[FlightItinerary]') -> str:
+    sections = group_by_destination(flights)
+
+    return '\n\n\n'.join(
+        '\n\n'.join(
+            (
+                f'=== {destination} ===',
+                *map(render_itinerary_text, section_flights),
+            )
+        )
+        for destination, section_flights in sections.items()
+    )
+
+
+def render_digest_html(flights: 'Iterable[FlightItinerary]') -> str:
+    sections = group_by_destination(flights)
+
+    body = ''.join(
+        f'<h2>{escape(destination)}</h2>'
+        + ''.join(map(render_itinerary_html, section_flights))
+        for destination, section_flights in sections.items()
+    )
+    return f'<html><body>{body}</body></html>'
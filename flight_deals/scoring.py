@@ -0,0 +1,199 @@
+import importlib.util
+import math
+import statistics
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+
+from flight_deals.flight_data import raw_price
+from flight_deals.search_plan import SearchQuery
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """Filters applied to every candidate of a run before ranking them by
+    price per night, then price, then departure time."""
+
+    within_price_cap: bool = True
+    max_price_per_night: float | None = None
+    max_stopovers: int | None = None
+    median_ratio: float | None = None
+    top_k: int | None = None
+
+
+def parse_epoch(timestamp: str) -> float:
+    # Only used for ordering, so the offset and fraction are left out.
+    return (
+        datetime.fromisoformat(timestamp[:19])
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+class Candidates:
+    """This class is responsible for holding the itineraries found in a run
+    as columns, one row per itinerary, grouped by the query that found it.
+
+    Columns are typed arrays, which NumPy reads without copying.
+    """
+
+    def __init__(self) -> None:
+        self.queries: list[SearchQuery] = []
+        self.itineraries: list[dict[str, Any]] = []
+        self._destination_ids: dict[str, int] = {}
+        self.groups = array('q')
+        self.destinations = array('q')
+        self.prices = array('d')
+        self.price_caps = array('d')
+        self.nights = array('d')
+        self.stopovers = array('q')
+        self.departures = array('d')
+
+    def __len__(self) -> int:
+        return len(self.itineraries)
+
+    def add(
+        self, query: SearchQuery, itineraries: list[dict[str, Any]]
+    ) -> None:
+        group = len(self.queries)
+        self.queries.append(query)
+        price_cap = query.get('price_to')
+        destination = self._destination_ids.setdefault(
+            query['fly_to'], len(self._destination_ids)
+        )
+
+        for itinerary in itineraries:
+            route = itinerary.get('route') or [{}]
+            directions = 2 if any(leg.get('return') for leg in route) else 1
+
+            self.itineraries.append(itinerary)
+            self.groups.append(group)
+            self.destinations.append(destination)
+            self.prices.append(float(raw_price(itinerary)))
+            self.price_caps.append(
+                math.inf if price_cap is None else float(price_cap)
+            )
+            self.nights.append(max(itinerary.get('nightsInDest') or 1, 1))
+            self.stopovers.append(max(len(route) - directions, 0))
+            self.departures.append(
+                parse_epoch(route[0].get('local_departure', '1970-01-01'))
+            )
+
+
+@lru_cache(maxsize=None)
+def has_numpy() -> bool:
+    return importlib.util.find_spec('numpy') is not None
+
+
+def rank(candidates: Candidates, rules: ScoringRules) -> list[int]:
+    """Return the indexes of the best candidate of each query that passes
+    the rules, best first.
+
+    Uses NumPy when it is installed, which is much faster on large runs,
+    and an equivalent pure Python pass otherwise.
+    """
+
+    if not candidates:
+        return []
+    if has_numpy():
+        return _rank_numpy(candidates, rules)
+    return _rank_python(candidates, rules)
+
+
+def _rank_numpy(candidates: Candidates, rules: ScoringRules) -> list[int]:
+    import numpy as np
+
+    prices = np.frombuffer(candidates.prices)
+    per_night = prices / np.frombuffer(candidates.nights)
+    groups = np.frombuffer(candidates.groups, dtype=np.int64)
+
+    # Itineraries without a price are priced at infinity and never win.
+    mask = np.isfinite(prices)
+    if rules.within_price_cap:
+        mask &= prices <= np.frombuffer(candidates.price_caps)
+    if rules.max_price_per_night is not None:
+        mask &= per_night <= rules.max_price_per_night
+    if rules.max_stopovers is not None:
+        stopovers = np.frombuffer(candidates.stopovers, dtype=np.int64)
+        mask &= stopovers <= rules.max_stopovers
+    if rules.median_ratio is not None:
+        destinations = np.frombuffer(candidates.destinations, dtype=np.int64)
+        order = np.lexsort((prices, destinations))
+        counts = np.bincount(destinations)
+        starts = np.cumsum(counts) - counts
+        sorted_prices = prices[order]
+        medians = (
+            sorted_prices[starts + (counts - 1) // 2]
+            + sorted_prices[starts + counts // 2]
+        ) / 2
+        mask &= prices <= rules.median_ratio * medians[destinations]
+
+    order = np.lexsort(
+        (np.frombuffer(candidates.departures), prices, per_night)
+    )
+    order = order[mask[order]]
+    _, first = np.unique(groups[order], return_index=True)
+    winners = order[np.sort(first)]
+
+    return [int(index) for index in winners[: rules.top_k]]
+
+
+def _rank_python(candidates: Candidates, rules: ScoringRules) -> list[int]:
+    prices = candidates.prices
+    per_night = [
+        price / nights for price, nights in zip(prices, candidates.nights)
+    ]
+
+    medians: dict[int, float] = {}
+    if rules.median_ratio is not None:
+        by_destination: dict[int, list[float]] = {}
+        for destination, price in zip(candidates.destinations, prices):
+            by_destination.setdefault(destination, []).append(price)
+        medians = {
+            destination: statistics.median(destination_prices)
+            for destination, destination_prices in by_destination.items()
+        }
+
+    def passes(index: int) -> bool:
+        price = prices[index]
+        return (
+            math.isfinite(price)
+            and (
+                not rules.within_price_cap
+                or price <= candidates.price_caps[index]
+            )
+            and (
+                rules.max_price_per_night is None
+                or per_night[index] <= rules.max_price_per_night
+            )
+            and (
+                rules.max_stopovers is None
+                or candidates.stopovers[index] <= rules.max_stopovers
+            )
+            and (
+                rules.median_ratio is None
+                or price
+                <= rules.median_ratio * medians[candidates.destinations[index]]
+            )
+        )
+
+    ranked = sorted(
+        filter(passes, range(len(candidates))),
+        key=lambda index: (
+            per_night[index],
+            prices[index],
+            candidates.departures[index],
+        ),
+    )
+
+    winners = []
+    seen_groups = set()
+    for index in ranked:
+        group = candidates.groups[index]
+        if group not in seen_groups:
+            seen_groups.add(group)
+            winners.append(index)
+
+    return winners[: rules.top_k]
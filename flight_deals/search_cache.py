@@ -0,0 +1,135 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Protocol, runtime_checkable
+
+from pydantic import BaseModel
+
+
+def make_cache_key(params: BaseModel) -> str:
+    canonical = json.dumps(params.dict(), sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@runtime_checkable
+class SearchCache(Protocol):
+    def get(self, key: str) -> Any | None:
+        ...
+
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+
+class MemoryCache:
+    """This class is responsible for caching search responses in memory."""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """This class is responsible for caching search responses on disk."""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_accessed_at
+                    ON responses (accessed_at);
+                """
+            )
+
+    def get(self, key: str) -> Any | None:
+        now = self._clock()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT value, expires_at FROM responses WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at <= now:
+                self._connection.execute(
+                    'DELETE FROM responses WHERE key = ?', (key,)
+                )
+                return None
+
+            self._connection.execute(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                (now, key),
+            )
+            return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = self._clock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._connection.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        self._connection.close()
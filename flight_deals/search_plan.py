@@ -0,0 +1,111 @@
+import json
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from flight_deals.sheet_api import Row
+
+SearchQuery = dict[str, Any]
+
+
+def make_query_key(query: SearchQuery) -> str:
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+class SearchPlan:
+    """This class is responsible for planning origin x destination searches.
+
+    Identical queries are planned once and their results shared by every
+    origin that needs them.
+    """
+
+    def __init__(
+        self,
+        origins: Iterable[str],
+        destinations: Iterable[Row],
+        search_params: dict[str, Any],
+    ) -> None:
+        self.queries: dict[str, SearchQuery] = {}
+        self.origin_keys: dict[str, list[str]] = {}
+
+        destinations = list(destinations)
+        for origin in origins:
+            keys = self.origin_keys.setdefault(origin, [])
+            seen = set(keys)
+            for row in destinations:
+                destination_code = row.get('iataCode', '')
+                if not destination_code or destination_code == origin:
+                    continue
+
+                query = {
+                    **search_params,
+                    'fly_from': origin,
+                    'fly_to': destination_code,
+                    'price_to': row.get('lowestPrice'),
+                }
+                key = make_query_key(query)
+                self.queries.setdefault(key, query)
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def run(
+        self,
+        search_flights_fn: Callable[..., list[dict[str, Any]]],
+        max_workers: int = 1,
+    ) -> dict[str, list[tuple[SearchQuery, list[dict[str, Any]]]]]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(
+                zip(
+                    self.queries,
+                    executor.map(search_flights_fn, self.queries.values()),
+                )
+            )
+
+        return {
+            origin: [(self.queries[key], results[key]) for key in keys]
+            for origin, keys in self.origin_keys.items()
+        }
+
+    def stream(
+        self,
+        search_flights_fn: Callable[..., list[dict[str, Any]]],
+        max_workers: int = 1,
+        max_pending: int | None = None,
+    ) -> Iterator[tuple[SearchQuery, list[dict[str, Any]]]]:
+        """Yield each query with its results as soon as they arrive.
+
+        At most `max_pending` searches are in flight or waiting to be
+        consumed, so a slow consumer holds back new searches.
+        """
+
+        queries = iter(self.queries.values())
+        max_pending = max_pending or 2 * max_workers
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending: dict[Future[list[dict[str, Any]]], SearchQuery] = {
+                executor.submit(search_flights_fn, query): query
+                for query in islice(queries, max_pending)
+            }
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        query = pending.pop(future)
+                        yield query, future.result()
+
+                        for next_query in islice(queries, 1):
+                            pending[
+                                executor.submit(search_flights_fn, next_query)
+                            ] = next_query
+            finally:
+                for future in pending:
+                    future.cancel()
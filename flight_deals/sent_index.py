@@ -0,0 +1,95 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Callable, Iterable
+
+from flight_deals.flight_data import FlightItinerary
+
+DAY = 24 * 60 * 60
+
+
+def make_fingerprint(flight: FlightItinerary, price_bucket: int = 50) -> str:
+    """Identify an itinerary by its legs, dates and price bucket, so that
+    small price changes of the same deal share a fingerprint."""
+
+    legs = '|'.join(
+        f'{leg.departure_location_code}>{leg.arrival_location_code}'
+        f'@{leg.departure_datetime:%Y%m%d%H%M}'
+        for leg in flight.route
+    )
+    bucket = int(flight.price // price_bucket)
+    return hashlib.sha1(
+        f'{legs}#{flight.currency}#{bucket}'.encode()
+    ).hexdigest()
+
+
+class SentIndex:
+    """This class is responsible for remembering notified deals."""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 7 * DAY,
+        price_bucket: int = 50,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.price_bucket = price_bucket
+        self._clock = clock
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sent (
+                    fingerprint TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS sent_expires_at
+                    ON sent (expires_at);
+                """
+            )
+        self.purge_expired()
+
+    def fingerprint(self, flight: FlightItinerary) -> str:
+        return make_fingerprint(flight, self.price_bucket)
+
+    def was_sent(self, flight: FlightItinerary) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT 1 FROM sent WHERE fingerprint = ? AND expires_at > ?',
+                (self.fingerprint(flight), self._clock()),
+            ).fetchone()
+        return row is not None
+
+    def mark_sent(self, flights: Iterable[FlightItinerary]) -> None:
+        expires_at = self._clock() + self.ttl
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO sent VALUES (?, ?)',
+                ((self.fingerprint(flight), expires_at) for flight in flights),
+            )
+
+    def purge_expired(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM sent WHERE expires_at <= ?', (self._clock(),)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> 'SentIndex':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
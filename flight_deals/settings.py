@@ -1,12 +1,25 @@
-import dotenv
-from pydantic import BaseSettings, HttpUrl, SecretStr
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal
 
-dotenv.load_dotenv(dotenv.find_dotenv())
+from pydantic import (
+    BaseSettings,
+    Field,
+    HttpUrl,
+    NonNegativeFloat,
+    NonNegativeInt,
+    PositiveFloat,
+    PositiveInt,
+    SecretStr,
+)
 
 
 class SheetAPISettings(BaseSettings):
     SPREADSHEET_URL: HttpUrl
     AUTH: SecretStr | None = None
+    MAX_WORKERS: PositiveInt = 4
+    INCREMENTAL_SYNC: bool = False
 
     class Config:
         env_prefix = 'SHEET_API_'
@@ -15,6 +28,10 @@ class SheetAPISettings(BaseSettings):
 class FlightAPISettings(BaseSettings):
     BASE_URL: HttpUrl
     KEY: SecretStr
+    RATE_LIMIT: PositiveFloat = 10.0
+    BURST: PositiveInt = 10
+    MAX_RETRIES: NonNegativeInt = 3
+    MAX_RETRY_AFTER: NonNegativeFloat = 300.0
 
     class Config:
         env_prefix = 'FLIGHT_API_'
@@ -25,6 +42,9 @@ class SMTPSettings(BaseSettings):
     PORT: int
     USERNAME: SecretStr
     PASSWORD: SecretStr
+    MAX_MESSAGES_PER_CONNECTION: PositiveInt | None = None
+    POOL_SIZE: PositiveInt = 4
+    MAX_RETRIES: NonNegativeInt = 2
 
     class Config:
         env_prefix = 'SMTP_'
@@ -33,12 +53,138 @@ class SMTPSettings(BaseSettings):
 class EmailSettings(BaseSettings):
     SENDER: str
     RECIPIENTS: str
+    DIGEST: bool = False
+    DEDUP: bool = False
+    DEDUP_TTL: PositiveInt = 7 * 24 * 60 * 60
+    DEDUP_PRICE_BUCKET: PositiveInt = 50
+    PER_RECIPIENT: bool = False
 
     class Config:
         env_prefix = 'EMAIL_'
 
 
-SHEET_API = SheetAPISettings()
-FLIGHT_API = FlightAPISettings()
-SMTP_SERVER = SMTPSettings()
-EMAIL = EmailSettings()
+class HTTPSettings(BaseSettings):
+    POOL_CONNECTIONS: PositiveInt = 10
+    POOL_MAXSIZE: PositiveInt = 10
+
+    class Config:
+        env_prefix = 'HTTP_'
+
+
+class CacheSettings(BaseSettings):
+    DIR: Path = Path('.cache')
+    IATA_TTL: PositiveInt = 30 * 24 * 60 * 60
+    IATA_NEGATIVE_TTL: PositiveInt = 24 * 60 * 60
+    SEARCH_BACKEND: Literal['none', 'memory', 'disk'] = 'none'
+    SEARCH_TTL: PositiveInt = 60 * 60
+    SEARCH_MAX_ENTRIES: PositiveInt = 10_000
+
+    class Config:
+        env_prefix = 'CACHE_'
+
+
+class HistorySettings(BaseSettings):
+    ENABLED: bool = False
+    PATH: Path = Path('.cache/price_history.sqlite3')
+    WINDOW_DAYS: PositiveFloat = 30
+    MIN_SAMPLES: PositiveInt = 5
+    Z_SCORE: PositiveFloat = 2.0
+
+    class Config:
+        env_prefix = 'HISTORY_'
+
+
+class SearchSettings(BaseSettings):
+    ORIGINS: list[str] = ['SSA']
+    MAX_WORKERS: PositiveInt = 8
+    STREAMING: bool = False
+    SHARD_DAYS: PositiveInt | None = None
+    SHARD_WORKERS: PositiveInt = 4
+    EXPORT_PATH: Path | None = None
+
+    class Config:
+        env_prefix = 'SEARCH_'
+
+        @classmethod
+        def parse_env_var(cls, field_name: str, raw_val: str) -> Any:
+            if field_name == 'ORIGINS':
+                return [code.strip() for code in raw_val.split(',')]
+            return cls.json_loads(raw_val)  # type: ignore[attr-defined]
+
+
+class ScoringSettings(BaseSettings):
+    ENABLED: bool = False
+    WITHIN_PRICE_CAP: bool = True
+    MAX_PRICE_PER_NIGHT: PositiveFloat | None = None
+    MAX_STOPOVERS: NonNegativeInt | None = None
+    MEDIAN_RATIO: PositiveFloat | None = None
+    TOP_K: PositiveInt | None = None
+
+    class Config:
+        env_prefix = 'SCORING_'
+
+
+class DaemonSettings(BaseSettings):
+    INTERVAL: PositiveFloat = 60 * 60
+    SPREAD: float = Field(0.5, ge=0, le=1)
+
+    class Config:
+        env_prefix = 'DAEMON_'
+
+
+class MetricsSettings(BaseSettings):
+    ENABLED: bool = False
+    JSON_PATH: Path | None = None
+    PROMETHEUS_PATH: Path | None = None
+
+    class Config:
+        env_prefix = 'METRICS_'
+
+
+_SETTINGS: dict[str, type[BaseSettings]] = {
+    'SHEET_API': SheetAPISettings,
+    'FLIGHT_API': FlightAPISettings,
+    'SMTP_SERVER': SMTPSettings,
+    'EMAIL': EmailSettings,
+    'HTTP': HTTPSettings,
+    'CACHE': CacheSettings,
+    'HISTORY': HistorySettings,
+    'SEARCH': SearchSettings,
+    'SCORING': ScoringSettings,
+    'DAEMON': DaemonSettings,
+    'METRICS': MetricsSettings,
+}
+_lock = threading.Lock()
+
+# Each of these is built from the environment the first time it is
+# accessed, so importing this module neither reads `.env` nor fails on
+# settings that the caller does not use.
+SHEET_API: SheetAPISettings
+FLIGHT_API: FlightAPISettings
+SMTP_SERVER: SMTPSettings
+EMAIL: EmailSettings
+HTTP: HTTPSettings
+CACHE: CacheSettings
+HISTORY: HistorySettings
+SEARCH: SearchSettings
+SCORING: ScoringSettings
+DAEMON: DaemonSettings
+METRICS: MetricsSettings
+
+
+@lru_cache(maxsize=None)
+def load_dotenv() -> None:
+    import dotenv
+
+    dotenv.load_dotenv(dotenv.find_dotenv())
+
+
+def __getattr__(name: str) -> BaseSettings:
+    if name not in _SETTINGS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    with _lock:
+        if name not in globals():
+            load_dotenv()
+            globals()[name] = _SETTINGS[name]()
+        return globals()[name]
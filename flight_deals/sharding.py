@@ -0,0 +1,104 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Callable, Hashable, Iterable
+
+from flight_deals.flight_data import raw_price
+
+DATE_FORMAT = '%d/%m/%Y'
+
+SearchFn = Callable[..., list[dict[str, Any]]]
+
+
+def split_date_window(
+    date_from: str, date_to: str, days: int
+) -> list[tuple[str, str]]:
+    """Split an inclusive `dd/mm/yyyy` date range into consecutive windows
+    of at most `days` days."""
+
+    start = datetime.strptime(date_from, DATE_FORMAT).date()
+    end = datetime.strptime(date_to, DATE_FORMAT).date()
+
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=days - 1), end)
+        windows.append(
+            (f'{start:{DATE_FORMAT}}', f'{window_end:{DATE_FORMAT}}')
+        )
+        start = window_end + timedelta(days=1)
+
+    return windows
+
+
+def itinerary_key(itinerary: dict[str, Any]) -> Hashable:
+    return tuple(
+        (flight.get('flyFrom'), flight.get('flyTo'), flight['local_departure'])
+        for flight in itinerary.get('route', [])
+    )
+
+
+def cheapest_unique(
+    itineraries: Iterable[dict[str, Any]], limit: int
+) -> list[dict[str, Any]]:
+    """Return the `limit` cheapest distinct itineraries, cheapest first.
+
+    Only the cheapest ones seen so far are held, in a max-heap keyed by
+    price, so memory stays at O(limit) however many itineraries there are.
+    Ties keep the itinerary seen first.
+    """
+
+    if limit < 1:
+        return []
+
+    heap: list[tuple[Decimal, int, Hashable, dict[str, Any]]] = []
+    kept: set[Hashable] = set()
+    for index, itinerary in enumerate(itineraries):
+        key = itinerary_key(itinerary)
+        if key in kept:
+            continue
+
+        entry = (-raw_price(itinerary), -index, key, itinerary)
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            _, _, evicted_key, _ = heapq.heapreplace(heap, entry)
+            kept.discard(evicted_key)
+        else:
+            continue
+        kept.add(key)
+
+    return [itinerary for *_, itinerary in sorted(heap, reverse=True)]
+
+
+def sharded(
+    search_flights_fn: SearchFn, days: int, max_workers: int = 4
+) -> SearchFn:
+    """Search each `days`-long slice of the date window concurrently and
+    keep the `limit` cheapest distinct itineraries overall.
+
+    The API returns at most `limit` results per request, so one request
+    over the whole window misses most cheap fares outside of its top few.
+    """
+
+    def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+        windows = split_date_window(query['date_from'], query['date_to'], days)
+        if len(windows) == 1:
+            return search_flights_fn(query)
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(windows))
+        ) as executor:
+            results = executor.map(
+                search_flights_fn,
+                (
+                    {**query, 'date_from': date_from, 'date_to': date_to}
+                    for date_from, date_to in windows
+                ),
+            )
+            return cheapest_unique(
+                chain.from_iterable(results), query.get('limit', 10)
+            )
+
+    return search_flights
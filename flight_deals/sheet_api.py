@@ -1,28 +1,54 @@
 import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any
 from urllib.parse import urljoin
 
-import inflect
 import requests
-from pydantic import HttpUrl, SecretStr, validate_arguments
+from pydantic import HttpUrl, PositiveInt, SecretStr, validate_arguments
+
+from flight_deals.http_session import HTTPClient
 
 Row = dict[str, Any]
-inflect_engine = inflect.engine()
 
 
+@lru_cache(maxsize=None)
 def get_singular_noun(noun: str) -> str:
-    return str(inflect_engine.singular_noun(noun) or noun)
+    # inflect takes a noticeable share of the startup time to import and
+    # set up, and a run only ever needs a couple of sheet names.
+    import inflect
+
+    return str(inflect.engine().singular_noun(noun) or noun)
+
+
+@dataclass
+class BatchUpdateResult:
+    updated: dict[int, dict[str, Any]] = field(default_factory=dict)
+    failed: dict[int, Exception] = field(default_factory=dict)
+
+
+class SheetUpdateError(Exception):
+    def __init__(self, failed: dict[int, Exception]) -> None:
+        super().__init__(f'Failed to update rows: {sorted(failed)}')
+        self.failed = failed
 
 
-class SheetAPI:
+class SheetAPI(HTTPClient):
     """This class is responsible for talking to the Google Sheet."""
 
-    @validate_arguments
+    @validate_arguments(config={'arbitrary_types_allowed': True})
     def __init__(
-        self, spreadsheet_url: HttpUrl, auth: SecretStr | None = None
+        self,
+        spreadsheet_url: HttpUrl,
+        auth: SecretStr | None = None,
+        session: requests.Session | None = None,
+        max_workers: PositiveInt = 4,
     ) -> None:
+        super().__init__(session)
         self.spreadsheet_url = spreadsheet_url
         self.auth = auth
+        self.max_workers = max_workers
 
     @property
     def headers(self) -> dict[str, Any]:
@@ -33,18 +59,44 @@ class SheetAPI:
 
     @validate_arguments
     def get_rows_from_sheet(self, sheet_name: str) -> list[Row]:
-        response = requests.get(
+        response = self.session.get(
             url=urljoin(self.spreadsheet_url, sheet_name),
             headers=self.headers,
         )
         response.raise_for_status()
         return response.json().get(sheet_name, [])
 
+    @validate_arguments
+    def get_rows_if_changed(
+        self, sheet_name: str, etag: str | None = None
+    ) -> tuple[list[Row] | None, str | None]:
+        """Fetch the rows unless they still match `etag`.
+
+        Returns `None` as rows when the server answers 304 Not Modified,
+        along with the ETag to send next time.
+        """
+
+        headers = self.headers
+        if etag is not None:
+            headers['If-None-Match'] = etag
+
+        response = self.session.get(
+            url=urljoin(self.spreadsheet_url, sheet_name), headers=headers
+        )
+        if response.status_code == 304:
+            return None, etag
+
+        response.raise_for_status()
+        return (
+            response.json().get(sheet_name, []),
+            response.headers.get('ETag'),
+        )
+
     @validate_arguments
     def update_sheet_row(
         self, sheet_name: str, row_id: int, body: dict[str, Any]
     ) -> dict[str, Any]:
-        response = requests.put(
+        response = self.session.put(
             url=urljoin(
                 self.spreadsheet_url, posixpath.join(sheet_name, str(row_id))
             ),
@@ -53,3 +105,31 @@ class SheetAPI:
         )
         response.raise_for_status()
         return response.json()
+
+    @validate_arguments
+    def update_sheet_rows(
+        self, sheet_name: str, rows: list[Row]
+    ) -> BatchUpdateResult:
+        """Update many rows, reporting failures per row.
+
+        The sheet API has no batch endpoint, so rows are sent as single-row
+        PUTs over at most `max_workers` concurrent connections.
+        """
+
+        result = BatchUpdateResult()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                row['id']: executor.submit(
+                    self.update_sheet_row, sheet_name, row['id'], row
+                )
+                for row in rows
+            }
+
+        for row_id, future in futures.items():
+            try:
+                result.updated[row_id] = future.result()
+            except requests.RequestException as exc:
+                result.failed[row_id] = exc
+
+        return result
@@ -0,0 +1,15 @@
+import pytest
+
+from tests import factories
+from tests.factories import ItineraryFactory
+from tests.fakes import FakeClock
+
+
+@pytest.fixture
+def make_itinerary() -> ItineraryFactory:
+    return factories.make_itinerary
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
@@ -0,0 +1,40 @@
+from typing import Any, Callable
+
+ItineraryFactory = Callable[..., dict[str, Any]]
+
+
+def make_flight(
+    fly_from: str, fly_to: str, is_return: int, departure: str
+) -> dict[str, Any]:
+    return {
+        'flyFrom': fly_from,
+        'flyTo': fly_to,
+        'cityFrom': fly_from,
+        'cityCodeFrom': fly_from,
+        'cityTo': fly_to,
+        'cityCodeTo': fly_to,
+        'return': is_return,
+        'local_departure': departure,
+        'local_arrival': departure,
+    }
+
+
+def make_itinerary(
+    city_code: str,
+    price: int,
+    fly_from: str = 'SSA',
+    departure: str = '2023-04-17T21:00:00.000Z',
+) -> dict[str, Any]:
+    return {
+        'cityFrom': fly_from,
+        'cityCodeFrom': fly_from,
+        'cityTo': city_code,
+        'cityCodeTo': city_code,
+        'price': price,
+        'conversion': {'BRL': price},
+        'nightsInDest': 7,
+        'route': [
+            make_flight(fly_from, city_code, 0, departure),
+            make_flight(city_code, fly_from, 1, departure),
+        ],
+    }
@@ -0,0 +1,13 @@
+class FakeClock:
+    """A clock that only moves when a test moves it, recording the sleeps
+    asked of it."""
+
+    def __init__(self) -> None:
+        self.now = 1_000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
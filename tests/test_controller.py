@@ -0,0 +1,370 @@
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+
+from flight_deals.controller import (
+    find_cheap_flights,
+    find_cheap_flights_by_origin,
+    iter_cheap_flights,
+    notify,
+    notify_each_recipient,
+    rank_cheap_flights_by_origin,
+    update_destination_codes,
+)
+from flight_deals.data_manager import DataManager
+from flight_deals.email_pool import EmailPool, SendReport
+from flight_deals.flight_data import FlightItinerary
+from flight_deals.price_history import (
+    DropDetector,
+    Observation,
+    PriceHistory,
+    Route,
+)
+from flight_deals.scoring import ScoringRules
+from flight_deals.sent_index import SentIndex
+from flight_deals.sheet_api import BatchUpdateResult
+from tests.factories import ItineraryFactory
+
+
+@pytest.fixture
+def sheet_api(mocker: MockFixture) -> MagicMock:
+    return mocker.MagicMock()
+
+
+@pytest.fixture
+def destinations(sheet_api: MagicMock) -> DataManager:
+    data_manager = DataManager('destinations', sheet_api)
+    data_manager.data = [
+        {'id': 2, 'city': 'Paris', 'iataCode': 'PAR', 'lowestPrice': 500},
+        {'id': 3, 'city': 'Nowhere', 'iataCode': '', 'lowestPrice': 100},
+        {'id': 4, 'city': 'Tokyo', 'iataCode': 'TYO', 'lowestPrice': 900},
+        {'id': 5, 'city': 'Lisbon', 'iataCode': 'LIS', 'lowestPrice': 300},
+    ]
+    return data_manager
+
+
+def test_find_cheap_flights_keeps_destination_order_when_concurrent(
+    destinations: DataManager, make_itinerary: ItineraryFactory
+) -> None:
+    delays = {'PAR': 0.03, 'TYO': 0.0, 'LIS': 0.01}
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        time.sleep(delays[params['fly_to']])
+        return [make_itinerary(params['fly_to'], params['price_to'])]
+
+    flights = find_cheap_flights(
+        destinations, search_flights, {'fly_from': 'SSA'}, max_workers=3
+    )
+
+    assert [flight.destination_city_code for flight in flights] == [
+        'PAR',
+        'TYO',
+        'LIS',
+    ]
+
+
+def test_find_cheap_flights_does_not_mutate_search_params(
+    destinations: DataManager,
+) -> None:
+    search_params = {'fly_from': 'SSA', 'curr': 'BRL'}
+    queries = []
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append(params)
+        return []
+
+    flights = find_cheap_flights(
+        destinations, search_flights, search_params, max_workers=2
+    )
+
+    assert flights == []
+    assert search_params == {'fly_from': 'SSA', 'curr': 'BRL'}
+    assert sorted(query['fly_to'] for query in queries) == [
+        'LIS',
+        'PAR',
+        'TYO',
+    ]
+
+
+def test_find_cheap_flights_by_origin_deduplicates_identical_queries(
+    destinations: DataManager, make_itinerary: ItineraryFactory
+) -> None:
+    destinations.data.append(
+        {'id': 6, 'city': 'paris', 'iataCode': 'PAR', 'lowestPrice': 500}
+    )
+    queries = []
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append((params['fly_from'], params['fly_to']))
+        return [
+            make_itinerary(
+                params['fly_to'], params['price_to'], params['fly_from']
+            )
+        ]
+
+    flights = find_cheap_flights_by_origin(
+        destinations,
+        search_flights,
+        {'curr': 'BRL'},
+        origins=['SSA', 'LIS', 'SSA'],
+        max_workers=4,
+    )
+
+    assert len(queries) == len(set(queries)) == 5
+    assert [flight.destination_city_code for flight in flights['SSA']] == [
+        'PAR',
+        'TYO',
+        'LIS',
+    ]
+    assert [flight.destination_city_code for flight in flights['LIS']] == [
+        'PAR',
+        'TYO',
+    ]
+
+
+def test_iter_cheap_flights_yields_deals_as_they_arrive(
+    destinations: DataManager, make_itinerary: ItineraryFactory
+) -> None:
+    delays = {'PAR': 0.2, 'TYO': 0.0, 'LIS': 0.0}
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        time.sleep(delays[params['fly_to']])
+        return [make_itinerary(params['fly_to'], params['price_to'])]
+
+    flights = iter_cheap_flights(
+        destinations, search_flights, {}, origins=['SSA'], max_workers=3
+    )
+    first = next(flights)
+
+    assert first.destination_city_code != 'PAR'
+    assert sorted(flight.destination_city_code for flight in flights) == [
+        code
+        for code in ('LIS', 'PAR', 'TYO')
+        if code != first.destination_city_code
+    ]
+
+
+def test_rank_cheap_flights_by_origin_ranks_across_destinations(
+    destinations: DataManager, make_itinerary: ItineraryFactory
+) -> None:
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        return [
+            make_itinerary(params['fly_to'], params['price_to'] + 100),
+            make_itinerary(params['fly_to'], params['price_to']),
+        ]
+
+    flights = rank_cheap_flights_by_origin(
+        destinations,
+        search_flights,
+        {},
+        origins=['SSA'],
+        rules=ScoringRules(top_k=2),
+    )
+
+    assert [
+        (flight.destination_city_code, flight.price)
+        for flight in flights['SSA']
+    ] == [('LIS', 300), ('PAR', 500)]
+
+
+def test_find_cheap_flights_by_origin_uses_price_history(
+    destinations: DataManager,
+    make_itinerary: ItineraryFactory,
+    tmp_path: Path,
+    mocker: MockFixture,
+) -> None:
+    history = PriceHistory(tmp_path / 'history.sqlite3')
+    history.record_many(
+        Observation(Route('SSA', 'TYO', 'BRL'), '', '', price)
+        for price in (2_000, 2_100, 1_900)
+    )
+    record_many = mocker.spy(history, 'record_many')
+    detector = DropDetector(history, min_samples=3)
+    prices = {'PAR': 600, 'TYO': 1_000, 'LIS': 250}
+    queries = []
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append(params)
+        return [make_itinerary(params['fly_to'], prices[params['fly_to']])]
+
+    flights = find_cheap_flights_by_origin(
+        destinations,
+        search_flights,
+        {'curr': 'BRL'},
+        origins=['SSA'],
+        detector=detector,
+    )
+
+    assert all(query['price_to'] is None for query in queries)
+    assert [flight.destination_city_code for flight in flights['SSA']] == [
+        'TYO',
+        'LIS',
+    ]
+    assert history.price_stats(Route('SSA', 'PAR', 'BRL'), 1).samples == 1
+    record_many.assert_called_once()
+
+
+def test_rank_cheap_flights_by_origin_uses_price_history(
+    destinations: DataManager,
+    make_itinerary: ItineraryFactory,
+    tmp_path: Path,
+) -> None:
+    history = PriceHistory(tmp_path / 'history.sqlite3')
+    history.record_many(
+        Observation(Route('SSA', 'TYO', 'BRL'), '', '', price)
+        for price in (2_000, 2_100, 1_900)
+    )
+    prices = {'PAR': 600, 'TYO': 1_000, 'LIS': 250}
+    queries = []
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append(params)
+        return [make_itinerary(params['fly_to'], prices[params['fly_to']])]
+
+    flights = rank_cheap_flights_by_origin(
+        destinations,
+        search_flights,
+        {'curr': 'BRL'},
+        origins=['SSA'],
+        detector=DropDetector(history, min_samples=3),
+    )
+
+    assert all(query['price_to'] is None for query in queries)
+    assert [flight.destination_city_code for flight in flights['SSA']] == [
+        'LIS',
+        'TYO',
+    ]
+    assert history.price_stats(Route('SSA', 'PAR', 'BRL'), 1).samples == 1
+
+
+def test_iter_cheap_flights_records_prices_in_chunks(
+    destinations: DataManager,
+    make_itinerary: ItineraryFactory,
+    tmp_path: Path,
+    mocker: MockFixture,
+) -> None:
+    history = PriceHistory(tmp_path / 'history.sqlite3')
+    record_many = mocker.spy(history, 'record_many')
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        return [make_itinerary(params['fly_to'], 100)]
+
+    flights = iter_cheap_flights(
+        destinations,
+        search_flights,
+        {'curr': 'BRL'},
+        origins=['SSA'],
+        detector=DropDetector(history),
+        flush_every=2,
+    )
+
+    assert len(list(flights)) == 3
+    assert [len(call.args[0]) for call in record_many.call_args_list] == [
+        2,
+        1,
+    ]
+
+
+def test_notify_skips_flights_already_sent(
+    make_itinerary: ItineraryFactory, tmp_path: Path, mocker: MockFixture
+) -> None:
+    sent_index = SentIndex(tmp_path / 'sent.sqlite3')
+    email_client = mocker.MagicMock()
+    flights = [
+        FlightItinerary.parse_obj(make_itinerary(city_code, 500))
+        for city_code in ('PAR', 'LIS')
+    ]
+    sent_index.mark_sent(flights[:1])
+
+    notify(
+        flights, email_client, 'me@example.com', 'you@example.com', sent_index
+    )
+    notify(
+        flights, email_client, 'me@example.com', 'you@example.com', sent_index
+    )
+
+    email_client.send_message.assert_called_once()
+    assert 'LIS' in email_client.send_message.call_args.args[0]['Subject']
+
+
+def test_notify_each_recipient_hides_the_other_recipients(
+    tmp_path: Path, make_itinerary: ItineraryFactory, mocker: MockFixture
+) -> None:
+    sent: list[tuple[str, str]] = []
+
+    def send_messages(msgs: Any) -> SendReport:
+        sent.extend((msg['To'], msg['Subject']) for msg in msgs)
+        return SendReport(sent=len(sent))
+
+    email_pool = mocker.MagicMock(spec=EmailPool)
+    email_pool.send_messages.side_effect = send_messages
+    flight = FlightItinerary.parse_obj(make_itinerary('PAR', 500))
+
+    with SentIndex(tmp_path / 'sent.sqlite3') as sent_index:
+        report = notify_each_recipient(
+            [flight],
+            email_pool,
+            'sender@test.com',
+            ['a@test.com', 'b@test.com'],
+            sent_index,
+            digest=True,
+        )
+
+        assert sent_index.was_sent(flight)
+
+    assert report.sent == 2
+    assert [to for to, _ in sent] == ['a@test.com', 'b@test.com']
+    assert all('1 cheap flights' in subject for _, subject in sent)
+
+
+def test_notify_each_recipient_leaves_undelivered_flights_unsent(
+    tmp_path: Path, make_itinerary: ItineraryFactory, mocker: MockFixture
+) -> None:
+    def send_messages(msgs: Any) -> SendReport:
+        report = SendReport()
+        for msg in msgs:
+            if 'PAR' in msg['Subject']:
+                report.failed.append((msg['To'], OSError('outage')))
+                report.failed_messages.append(msg)
+            else:
+                report.sent += 1
+        return report
+
+    email_pool = mocker.MagicMock(spec=EmailPool)
+    email_pool.send_messages.side_effect = send_messages
+    paris, lisbon = (
+        FlightItinerary.parse_obj(make_itinerary(city_code, 500))
+        for city_code in ('PAR', 'LIS')
+    )
+
+    with SentIndex(tmp_path / 'sent.sqlite3') as sent_index:
+        notify_each_recipient(
+            [paris, lisbon],
+            email_pool,
+            'sender@test.com',
+            ['a@test.com', 'b@test.com'],
+            sent_index,
+        )
+
+        assert not sent_index.was_sent(paris)
+        assert sent_index.was_sent(lisbon)
+
+
+def test_update_destination_codes_skips_unchanged_rows_with_a_code(
+    destinations: DataManager, sheet_api: MagicMock
+) -> None:
+    destinations.changed_ids = {4}
+    sheet_api.update_sheet_rows.return_value = BatchUpdateResult()
+    lookups = []
+
+    def get_code(city_name: str) -> str:
+        lookups.append(city_name)
+        return city_name[:3].upper()
+
+    update_destination_codes(destinations, get_code)
+
+    assert lookups == ['Nowhere', 'Tokyo']
@@ -0,0 +1,46 @@
+from typing import Any
+
+from flight_deals.daemon import Daemon
+
+
+def test_run_forever_repeats_cycles_until_stopped() -> None:
+    daemon = Daemon(interval=0)
+    cycles: list[int] = []
+
+    def run_cycle() -> None:
+        cycles.append(len(cycles))
+        if len(cycles) == 2:
+            raise RuntimeError('API down')
+        if len(cycles) == 3:
+            daemon.stop()
+
+    daemon.run_forever(run_cycle)
+
+    assert cycles == [0, 1, 2]
+
+
+def test_stagger_skips_searches_once_stopped() -> None:
+    daemon = Daemon(interval=60)
+    queries: list[dict[str, Any]] = []
+
+    def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append(query)
+        return [{'price': 1}]
+
+    staggered = daemon.stagger(search_flights, searches=2, spread=3600)
+
+    assert staggered({'fly_to': 'LIS'}) == [{'price': 1}]
+    daemon.stop()
+    assert staggered({'fly_to': 'MAD'}) == []
+    assert queries == [{'fly_to': 'LIS'}]
+
+
+def test_stagger_is_a_no_op_without_spread() -> None:
+    daemon = Daemon(interval=60)
+
+    def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+        return []
+
+    assert daemon.stagger(search_flights, searches=5, spread=0) is (
+        search_flights
+    )
@@ -0,0 +1,155 @@
+from copy import deepcopy
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockFixture
+from requests.exceptions import HTTPError
+
+from flight_deals.data_manager import DataManager
+from flight_deals.sheet_api import BatchUpdateResult, Row, SheetUpdateError
+
+
+def update_rows(sheet_name: str, rows: list[Row]) -> BatchUpdateResult:
+    result = BatchUpdateResult()
+    for row in rows:
+        if row['city'] == 'Broken':
+            result.failed[row['id']] = HTTPError('500 Server Error')
+        else:
+            result.updated[row['id']] = {
+                'destination': {**row, 'updated': True}
+            }
+    return result
+
+
+@pytest.fixture
+def sheet_api(mocker: MockFixture) -> MagicMock:
+    sheet_api = mocker.MagicMock()
+    sheet_api.get_rows_from_sheet.return_value = [
+        {'id': 2, 'city': 'Paris', 'iataCode': ''},
+        {'id': 3, 'city': 'Tokyo', 'iataCode': 'TYO'},
+        {'id': 4, 'city': 'Broken', 'iataCode': ''},
+    ]
+    sheet_api.update_sheet_rows.side_effect = update_rows
+    return sheet_api
+
+
+@pytest.fixture
+def data_manager(sheet_api: MagicMock) -> DataManager:
+    data_manager = DataManager('destinations', sheet_api)
+    data_manager.load_data()
+    return data_manager
+
+
+def test_update_data_does_nothing_when_no_row_changed(
+    data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    data_manager.update_data()
+
+    assert data_manager.dirty_data == []
+    sheet_api.update_sheet_rows.assert_not_called()
+
+
+def test_update_data_writes_only_changed_rows_without_reloading(
+    data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    data_manager.data[0]['iataCode'] = 'PAR'
+    data_manager.data[1]['iataCode'] = 'TYO'
+
+    data_manager.update_data()
+
+    call_kwargs = sheet_api.update_sheet_rows.call_args.kwargs
+    assert [row['id'] for row in call_kwargs['rows']] == [2]
+    sheet_api.get_rows_from_sheet.assert_called_once()
+    assert data_manager.data[0]['updated'] is True
+    assert data_manager.dirty_data == []
+
+
+def test_update_data_keeps_failed_rows_dirty(
+    data_manager: DataManager,
+) -> None:
+    data_manager.data[0]['iataCode'] = 'PAR'
+    data_manager.data[2]['iataCode'] = 'XXX'
+
+    with pytest.raises(SheetUpdateError) as exc_info:
+        data_manager.update_data()
+
+    assert list(exc_info.value.failed) == [4]
+    assert data_manager.dirty_data == [data_manager.data[2]]
+
+
+@pytest.fixture
+def synced_data_manager(sheet_api: MagicMock, tmp_path: Path) -> DataManager:
+    sheet_api.get_rows_if_changed.return_value = (
+        sheet_api.get_rows_from_sheet.return_value,
+        '"v1"',
+    )
+    return DataManager(
+        'destinations', sheet_api, mirror_path=tmp_path / 'mirror.json'
+    )
+
+
+def test_first_sync_treats_every_row_as_changed(
+    synced_data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    synced_data_manager.load_data()
+
+    assert all(map(synced_data_manager.is_changed, synced_data_manager.data))
+    sheet_api.get_rows_if_changed.assert_called_with('destinations', None)
+
+
+def test_sync_uses_the_mirror_when_the_sheet_is_not_modified(
+    synced_data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    synced_data_manager.load_data()
+    synced_data_manager.update_data()
+    rows = deepcopy(synced_data_manager.data)
+    sheet_api.get_rows_if_changed.return_value = (
+        None,
+        '"v1"',
+    )
+
+    synced_data_manager.load_data()
+
+    sheet_api.get_rows_if_changed.assert_called_with('destinations', '"v1"')
+    assert synced_data_manager.data == rows
+    assert synced_data_manager.changed_ids == set()
+
+
+def test_sync_detects_the_rows_that_changed(
+    synced_data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    synced_data_manager.load_data()
+    synced_data_manager.update_data()
+    rows = deepcopy(synced_data_manager.data)
+    rows[1]['city'] = 'Osaka'
+    sheet_api.get_rows_if_changed.return_value = (
+        rows,
+        '"v2"',
+    )
+
+    synced_data_manager.load_data()
+
+    assert synced_data_manager.changed_ids == {3}
+
+
+def test_sync_keeps_unprocessed_changes_pending(
+    synced_data_manager: DataManager, sheet_api: MagicMock
+) -> None:
+    synced_data_manager.load_data()
+    synced_data_manager.update_data()
+    rows = deepcopy(synced_data_manager.data)
+    rows[1]['city'] = 'Osaka'
+    sheet_api.get_rows_if_changed.return_value = (rows, '"v2"')
+    synced_data_manager.load_data()
+
+    # The run stopped before processing the change.
+    sheet_api.get_rows_if_changed.return_value = (None, '"v2"')
+    synced_data_manager.load_data()
+
+    assert synced_data_manager.changed_ids == {3}
+
+    synced_data_manager.update_data()
+    synced_data_manager.load_data()
+
+    assert synced_data_manager.changed_ids == set()
@@ -1,4 +1,4 @@
-from smtplib import SMTP
+from smtplib import SMTP, SMTPServerDisconnected
 from typing import Any
 
 import pytest
@@ -77,3 +77,86 @@ def test_send_email(message_data: dict[str, Any], mocker: MockFixture) -> None:
     )
 
     assert fake_smtp.quit() == (221, b'2.0.0 Bye')
+
+
+@pytest.fixture
+def fake_smtp(mocker: MockFixture) -> Any:
+    return mocker.MagicMock(**{'sendmail.return_value': {}})
+
+
+@pytest.fixture
+def make_email_client(fake_smtp: Any) -> Any:
+    def _make_email_client(**kwargs: Any) -> EmailClient:
+        fake_smtp._host = f'{SMTP_SERVER.HOST}:{SMTP_SERVER.PORT}'
+        return EmailClient(
+            smtp_server=fake_smtp, credentials=('user', 'pass'), **kwargs
+        )
+
+    return _make_email_client
+
+
+def test_client_connects_to_the_given_address(
+    message_data: dict[str, Any], fake_smtp: Any
+) -> None:
+    email_client = EmailClient(
+        smtp_server=fake_smtp,
+        credentials=('user', 'pass'),
+        address=('smtp.test', 587),
+    )
+
+    email_client.send_message(make_message(**message_data))
+
+    fake_smtp.connect.assert_called_once_with('smtp.test', 587)
+    assert fake_smtp._host == 'smtp.test'
+
+
+def test_send_messages_uses_a_single_connection(
+    message_data: dict[str, Any], fake_smtp: Any, make_email_client: Any
+) -> None:
+    email_client = make_email_client()
+
+    email_client.send_messages(make_message(**message_data) for _ in range(3))
+
+    assert fake_smtp.login.call_count == 1
+    assert fake_smtp.sendmail.call_count == 3
+    assert fake_smtp.quit.call_count == 1
+
+
+def test_session_reconnects_after_max_messages_per_connection(
+    message_data: dict[str, Any], fake_smtp: Any, make_email_client: Any
+) -> None:
+    email_client = make_email_client(max_messages_per_connection=2)
+
+    with email_client:
+        for _ in range(5):
+            email_client.send_message(make_message(**message_data))
+
+    assert fake_smtp.login.call_count == 3
+    assert fake_smtp.quit.call_count == 3
+
+
+def test_session_reconnects_when_the_server_disconnects(
+    message_data: dict[str, Any], fake_smtp: Any, make_email_client: Any
+) -> None:
+    fake_smtp.sendmail.side_effect = [SMTPServerDisconnected(), {}, {}]
+    email_client = make_email_client()
+
+    with email_client:
+        email_client.send_message(make_message(**message_data))
+        email_client.send_message(make_message(**message_data))
+
+    assert fake_smtp.login.call_count == 2
+    assert fake_smtp.sendmail.call_count == 3
+
+
+def test_create_message_with_html_alternative(
+    message_data: dict[str, Any]
+) -> None:
+    message = make_message(**message_data, html_body='<p>Testing</p>')
+
+    html = message.get_body(preferencelist=('html',))
+    plain = message.get_body(preferencelist=('plain',))
+
+    assert message.get_content_type() == 'multipart/alternative'
+    assert html and '<p>Testing</p>' in str(html.get_payload())
+    assert plain and message_data['body'] in str(plain.get_payload())
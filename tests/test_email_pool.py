@@ -0,0 +1,137 @@
+import threading
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from typing import Any
+
+from pytest_mock import MockFixture
+
+from flight_deals.email_client import EmailClient, make_message
+from flight_deals.email_pool import EmailPool
+
+
+class FakeServers:
+    """Hands out a fake SMTP server per client, recording every call."""
+
+    def __init__(self, mocker: MockFixture) -> None:
+        self.mocker = mocker
+        self.servers: list[Any] = []
+        self.sent: list[str] = []
+        self.failures: dict[str, list[Exception]] = {}
+        self._lock = threading.Lock()
+
+    def _sendmail(
+        self, from_addr: str, to_addrs: str, msg: str
+    ) -> dict[str, Any]:
+        with self._lock:
+            failures = self.failures.get(to_addrs)
+            if failures:
+                raise failures.pop(0)
+            self.sent.append(to_addrs)
+        return {}
+
+    def make_client(self) -> EmailClient:
+        server = self.mocker.MagicMock(_host='localhost:25')
+        server.sendmail.side_effect = self._sendmail
+        with self._lock:
+            self.servers.append(server)
+        return EmailClient(smtp_server=server, credentials=('user', 'pass'))
+
+
+def make_messages(count: int) -> list[Any]:
+    return [
+        make_message('sender@test.com', f'user{number}@test.com')
+        for number in range(count)
+    ]
+
+
+def test_pool_sends_every_message_over_its_connections(
+    mocker: MockFixture,
+) -> None:
+    servers = FakeServers(mocker)
+    pool = EmailPool(servers.make_client, size=3)
+
+    report = pool.send_messages(make_messages(10))
+
+    assert report.sent == 10
+    assert sorted(servers.sent) == sorted(
+        f'user{number}@test.com' for number in range(10)
+    )
+    assert len(servers.servers) == 3
+    assert all(server.login.call_count <= 1 for server in servers.servers)
+
+
+def test_pool_retries_transient_failures_and_reports_refused_recipients(
+    mocker: MockFixture,
+) -> None:
+    servers = FakeServers(mocker)
+    servers.failures = {
+        'user1@test.com': [OSError('connection reset')],
+        'user2@test.com': [
+            SMTPRecipientsRefused({'user2@test.com': (550, b'No such user')})
+        ],
+    }
+    pool = EmailPool(
+        servers.make_client, size=2, max_retries=1, sleep=lambda _: None
+    )
+
+    report = pool.send_messages(make_messages(4))
+
+    assert report.sent == 3
+    assert report.retries == 1
+    assert [recipient for recipient, _ in report.failed] == ['user2@test.com']
+    assert [msg['To'] for msg in report.failed_messages] == ['user2@test.com']
+
+
+def test_pool_gives_up_after_max_retries(mocker: MockFixture) -> None:
+    servers = FakeServers(mocker)
+    servers.failures = {
+        'user0@test.com': [SMTPServerDisconnected()] * 6,
+    }
+    pool = EmailPool(
+        servers.make_client, size=1, max_retries=2, sleep=lambda _: None
+    )
+
+    report = pool.send_messages(make_messages(2))
+
+    assert report.sent == 1
+    assert report.retries == 2
+    assert len(report.failed) == 1
+
+
+def test_pool_fails_every_message_when_no_client_can_be_created() -> None:
+    def make_client() -> EmailClient:
+        raise ConnectionRefusedError('connection refused')
+
+    pool = EmailPool(make_client, size=2)
+    reports = []
+    sender = threading.Thread(
+        target=lambda: reports.append(pool.send_messages(make_messages(10))),
+        daemon=True,
+    )
+
+    sender.start()
+    sender.join(timeout=5)
+
+    assert not sender.is_alive()
+    (report,) = reports
+    assert report.sent == 0
+    assert len(report.failed) == 10
+
+
+def test_pool_keeps_sending_when_some_clients_cannot_be_created(
+    mocker: MockFixture,
+) -> None:
+    servers = FakeServers(mocker)
+    attempts: list[None] = []
+
+    def make_client() -> EmailClient:
+        attempts.append(None)
+        if len(attempts) > 1:
+            raise ConnectionRefusedError('connection refused')
+        return servers.make_client()
+
+    pool = EmailPool(make_client, size=3)
+
+    report = pool.send_messages(make_messages(10))
+
+    assert report.sent == 10
+    assert report.failed == []
@@ -1,6 +1,9 @@
+from decimal import Decimal
+from typing import Any
+
 import pytest
 
-from flight_deals.flight_data import Flight, FlightItinerary
+from flight_deals.flight_data import Flight, FlightItinerary, select_cheapest
 
 
 @pytest.fixture
@@ -79,3 +82,49 @@ def test_flight_itinerary_as_str(flight_itinerary: FlightItinerary) -> None:
     )
 
     assert str(flight_itinerary) == flight_itinerary_as_str
+
+
+def test_route_split_is_computed_once(
+    flight_itinerary: FlightItinerary,
+) -> None:
+    assert flight_itinerary.departing_route is flight_itinerary.departing_route
+    assert [flight.is_return for flight in flight_itinerary.return_route] == [
+        True
+    ]
+    assert '_split_route' not in flight_itinerary.dict()
+
+
+def test_select_cheapest_picks_the_lowest_price_without_parsing() -> None:
+    itineraries: list[dict[str, Any]] = [
+        {'price': 900},
+        {'price': 250.5},
+        {'price': 300},
+    ]
+
+    assert select_cheapest(itineraries) == {'price': 250.5}
+    assert select_cheapest([]) is None
+
+
+def test_route_legs_are_validated_on_first_access(
+    flight_itinerary: FlightItinerary,
+) -> None:
+    assert flight_itinerary._route is None
+
+    route = flight_itinerary.route
+
+    assert all(isinstance(flight, Flight) for flight in route)
+    assert flight_itinerary.route is route
+
+
+def test_itinerary_is_frozen_and_copies_do_not_share_caches(
+    flight_itinerary: FlightItinerary,
+) -> None:
+    text = str(flight_itinerary)
+
+    with pytest.raises(TypeError):
+        setattr(flight_itinerary, 'price', Decimal(1))
+
+    copy = flight_itinerary.copy(update={'price': Decimal(1)})
+
+    assert str(flight_itinerary) == text
+    assert 'Price: 1.00' in str(copy)
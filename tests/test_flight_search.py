@@ -3,9 +3,13 @@ from urllib.parse import urljoin
 
 import pytest
 from pydantic import HttpUrl, SecretStr, parse_obj_as
+from pytest_mock import MockFixture
+from requests.exceptions import HTTPError
 from requests_mock import Mocker
 
 from flight_deals.flight_search import FlightSearch, FlightSearchParams
+from flight_deals.http_session import make_session
+from flight_deals.search_cache import MemoryCache
 from flight_deals.settings import FLIGHT_API
 
 
@@ -67,3 +71,92 @@ def test_search_flights_must_return_a_list(
     result = flight_search.search_flights(search_params)
 
     assert isinstance(result, list)
+
+
+def test_flight_search_reuses_a_shared_session(
+    requests_mock: Mocker, mocker: MockFixture
+) -> None:
+    session = make_session(pool_connections=1, pool_maxsize=2)
+    close = mocker.spy(session, 'close')
+
+    with FlightSearch(
+        FLIGHT_API.BASE_URL, FLIGHT_API.KEY, session=session
+    ) as flight_search:
+        requests_mock.get(
+            url=urljoin(flight_search.base_url, 'locations/query'),
+            json={'locations': [{'name': 'Paris', 'code': 'PAR'}]},
+        )
+        flight_search.get_iata_code_by_city_name('Paris')
+        flight_search.get_iata_code_by_city_name('Paris')
+
+    assert flight_search.session is session
+    assert requests_mock.call_count == 2
+    close.assert_not_called()
+
+
+def test_search_retries_after_too_many_requests(
+    flight_search: FlightSearch, requests_mock: Mocker
+) -> None:
+    requests_mock.get(
+        url=urljoin(flight_search.base_url, 'locations/query'),
+        response_list=[
+            {'status_code': 429, 'headers': {'Retry-After': '0'}},
+            {'json': {'locations': [{'name': 'Paris', 'code': 'PAR'}]}},
+        ],
+    )
+
+    assert flight_search.get_iata_code_by_city_name('Paris') == 'PAR'
+    assert requests_mock.call_count == 2
+
+
+def test_search_raises_when_retries_are_exhausted(
+    flight_search: FlightSearch, requests_mock: Mocker
+) -> None:
+    flight_search.max_retries = 1
+    requests_mock.get(
+        url=urljoin(flight_search.base_url, 'locations/query'),
+        status_code=429,
+        headers={'Retry-After': '0'},
+    )
+
+    with pytest.raises(HTTPError):
+        flight_search.get_iata_code_by_city_name('Paris')
+    assert requests_mock.call_count == 2
+
+
+def test_search_gives_up_when_retry_after_is_too_long(
+    flight_search: FlightSearch, requests_mock: Mocker
+) -> None:
+    flight_search.max_retry_after = 60
+    requests_mock.get(
+        url=urljoin(flight_search.base_url, 'locations/query'),
+        status_code=429,
+        headers={'Retry-After': '3600'},
+    )
+
+    with pytest.raises(HTTPError):
+        flight_search.get_iata_code_by_city_name('Paris')
+    assert requests_mock.call_count == 1
+
+
+def test_search_flights_serves_repeated_params_from_cache(
+    flight_search: FlightSearch, requests_mock: Mocker
+) -> None:
+    flight_search.cache = MemoryCache(ttl=60)
+    search_params = FlightSearchParams(
+        fly_from='SSA',
+        fly_to='NYC',
+        date_from='01/01/2024',
+        date_to='01/02/2024',
+        curr='BRL',
+    )
+    requests_mock.get(
+        url=urljoin(flight_search.base_url, 'v2/search'),
+        json={'data': [{'id': '123456'}]},
+    )
+
+    first = flight_search.search_flights(search_params)
+    second = flight_search.search_flights(search_params.copy())
+
+    assert first == second == [{'id': '123456'}]
+    assert requests_mock.call_count == 1
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from flight_deals.iata_cache import IATACodeCache, lookup_many
+from tests.fakes import FakeClock
+
+
+@pytest.fixture
+def cache_path(tmp_path: Path) -> Path:
+    return tmp_path / 'iata_codes.json'
+
+
+def test_cached_lookup_skips_repeated_and_differently_cased_cities(
+    cache_path: Path, clock: FakeClock
+) -> None:
+    lookups = []
+
+    def get_code(city_name: str) -> str:
+        lookups.append(city_name)
+        return 'PAR'
+
+    cache = IATACodeCache(cache_path, clock=clock)
+    get_cached_code = cache.cached(get_code)
+
+    assert get_cached_code('Paris') == 'PAR'
+    assert get_cached_code('  PARIS ') == 'PAR'
+    assert lookups == ['Paris']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_is_persisted_and_expires(
+    cache_path: Path, clock: FakeClock
+) -> None:
+    with IATACodeCache(cache_path, ttl=60, clock=clock) as cache:
+        cache.set('Paris', 'PAR')
+
+    cache = IATACodeCache(cache_path, ttl=60, clock=clock)
+    assert cache.get('paris') == 'PAR'
+
+    clock.now += 61
+    assert cache.get('paris') is None
+
+
+def test_cities_without_a_match_are_negatively_cached(
+    cache_path: Path, clock: FakeClock
+) -> None:
+    cache = IATACodeCache(cache_path, ttl=60, negative_ttl=10, clock=clock)
+    cache.set('Atlantis', '')
+
+    assert cache.get('Atlantis') == ''
+
+    clock.now += 11
+    assert cache.get('Atlantis') is None
+
+
+def test_concurrent_lookups_of_the_same_city_share_one_request(
+    cache_path: Path, clock: FakeClock
+) -> None:
+    lookups = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def get_code(city_name: str) -> str:
+        lookups.append(city_name)
+        started.set()
+        release.wait(timeout=5)
+        return 'PAR'
+
+    cache = IATACodeCache(cache_path, clock=clock)
+    get_cached_code = cache.cached(get_code)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(get_cached_code, 'Paris')
+        started.wait(timeout=5)
+        follower = executor.submit(get_cached_code, 'paris ')
+        while not cache.coalesced:
+            time.sleep(0.001)
+        release.set()
+
+        assert (leader.result(), follower.result()) == ('PAR', 'PAR')
+
+    assert lookups == ['Paris']
+
+
+def test_failed_lookup_is_not_cached(
+    cache_path: Path, clock: FakeClock
+) -> None:
+    def get_code(city_name: str) -> str:
+        raise ConnectionError
+
+    cache = IATACodeCache(cache_path, clock=clock)
+
+    with pytest.raises(ConnectionError):
+        cache.cached(get_code)('Paris')
+    assert cache.get('Paris') is None
+
+
+def test_lookup_many_resolves_each_distinct_city_once() -> None:
+    lookups = []
+
+    def get_code(city_name: str) -> str:
+        lookups.append(city_name)
+        return city_name.strip()[:3].upper()
+
+    codes = lookup_many(
+        get_code, ['Paris', 'Tokyo', ' PARIS', 'Paris'], max_workers=2
+    )
+
+    assert codes == {'Paris': 'PAR', 'Tokyo': 'TOK', ' PARIS': 'PAR'}
+    assert sorted(lookups) == ['Paris', 'Tokyo']
@@ -0,0 +1,49 @@
+from flight_deals.flight_data import FlightItinerary
+from flight_deals.itinerary_store import (
+    CSV_COLUMNS,
+    CompactItinerary,
+    ItineraryStore,
+)
+from tests.factories import ItineraryFactory
+
+
+def test_compact_itinerary_round_trips_to_the_model(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    itinerary = FlightItinerary.parse_obj(make_itinerary('PAR', 4206))
+
+    compact = CompactItinerary.from_model(itinerary)
+
+    assert str(compact.to_model()) == str(itinerary)
+    assert not hasattr(compact, '__dict__')
+
+
+def test_store_accepts_raw_itineraries_and_interns_codes(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    store = ItineraryStore()
+    store.extend(
+        [make_itinerary('PAR', 900), make_itinerary(''.join(['P', 'AR']), 500)]
+    )
+
+    first, second = store
+
+    assert len(store) == 2
+    assert first.destination_city_code is second.destination_city_code
+    assert [model.price for model in store.to_models()] == [900, 500]
+    assert str(next(store.to_models())) == str(
+        FlightItinerary.parse_obj(make_itinerary('PAR', 900))
+    )
+
+
+def test_store_exports_one_csv_row_per_itinerary(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    store = ItineraryStore()
+    store.extend([make_itinerary('PAR', 900), make_itinerary('LIS', 500)])
+
+    header, *rows = store.to_csv().splitlines()
+
+    assert header.split(',') == list(CSV_COLUMNS)
+    assert [row.split(',')[1] for row in rows] == ['PAR', 'LIS']
+    assert [row.split(',')[-2] for row in rows] == ['900', '500']
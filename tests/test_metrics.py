@@ -0,0 +1,82 @@
+import requests_mock
+
+from flight_deals.http_session import make_session
+from flight_deals.metrics import Metrics, metrics
+
+
+def test_disabled_metrics_record_nothing() -> None:
+    registry = Metrics()
+
+    registry.increment('requests_total')
+    registry.observe('request_duration_seconds', 0.1)
+    with registry.timer('stage_duration_seconds'):
+        pass
+
+    assert registry.to_dict() == {'counters': [], 'histograms': []}
+
+
+def test_counters_are_kept_per_label_set() -> None:
+    registry = Metrics(enabled=True)
+
+    registry.increment('retries_total', status=429)
+    registry.increment('retries_total', status=429)
+    registry.increment('retries_total', 3, status=503)
+
+    assert registry.to_dict()['counters'] == [
+        {'name': 'retries_total', 'labels': {'status': '429'}, 'value': 2},
+        {'name': 'retries_total', 'labels': {'status': '503'}, 'value': 3},
+    ]
+
+
+def test_timed_decorator_observes_each_call() -> None:
+    registry = Metrics(enabled=True)
+
+    @registry.timed('stage_duration_seconds', stage='work')
+    def work(value: int) -> int:
+        return value * 2
+
+    assert work(2) == 4
+    assert work(3) == 6
+
+    (histogram,) = registry.to_dict()['histograms']
+    assert histogram['labels'] == {'stage': 'work'}
+    assert histogram['count'] == 2
+
+
+def test_prometheus_export_has_cumulative_buckets() -> None:
+    registry = Metrics(enabled=True, buckets=(0.1, 1.0))
+
+    registry.observe('latency_seconds', 0.05, host='api')
+    registry.observe('latency_seconds', 0.5, host='api')
+    registry.observe('latency_seconds', 5, host='api')
+    registry.increment('bytes_total', 10)
+
+    assert registry.to_prometheus().splitlines() == [
+        '# TYPE bytes_total counter',
+        'bytes_total 10',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{host="api",le="0.1"} 1',
+        'latency_seconds_bucket{host="api",le="1.0"} 2',
+        'latency_seconds_bucket{host="api",le="+Inf"} 3',
+        'latency_seconds_sum{host="api"} 5.55',
+        'latency_seconds_count{host="api"} 3',
+    ]
+
+
+def test_session_records_http_responses() -> None:
+    metrics.enable()
+    try:
+        with requests_mock.Mocker() as m:
+            m.get('https://api.test/data', content=b'12345')
+            make_session().get('https://api.test/data')
+
+        counters = metrics.to_dict()['counters']
+    finally:
+        metrics.enabled = False
+        metrics.reset()
+
+    assert {
+        'name': 'http_response_bytes_total',
+        'labels': {'host': 'api.test', 'method': 'GET'},
+        'value': 5,
+    } in counters
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pytest
+
+from flight_deals.price_history import (
+    DAY,
+    DropDetector,
+    Observation,
+    PriceHistory,
+    Route,
+)
+from tests.fakes import FakeClock
+
+ROUTE = Route('SSA', 'PAR', 'BRL')
+
+
+@pytest.fixture
+def history(tmp_path: Path, clock: FakeClock) -> PriceHistory:
+    return PriceHistory(tmp_path / 'history.sqlite3', clock=clock)
+
+
+def record_prices(history: PriceHistory, prices: list[float]) -> None:
+    history.record_many(
+        Observation(ROUTE, '01/01/2024', '01/07/2024', price)
+        for price in prices
+    )
+
+
+def test_best_price_only_looks_at_the_requested_window(
+    history: PriceHistory, clock: FakeClock
+) -> None:
+    record_prices(history, [900])
+    clock.now += 10 * DAY
+    record_prices(history, [1_000, 1_100])
+
+    assert history.best_price(ROUTE, days=30) == 900
+    assert history.best_price(ROUTE, days=5) == 1_000
+    assert history.best_price(Route('SSA', 'TYO', 'BRL'), days=30) is None
+
+
+def test_detector_flags_only_statistically_significant_drops(
+    history: PriceHistory,
+) -> None:
+    record_prices(history, [1_000, 1_020, 980, 1_010, 990])
+    detector = DropDetector(history, min_samples=5, z_score=2.0)
+
+    assert detector.is_significant_drop(ROUTE, 900)
+    assert not detector.is_significant_drop(ROUTE, 985)
+
+
+def test_detector_flags_any_price_below_a_constant_mean(
+    history: PriceHistory,
+) -> None:
+    record_prices(history, [1_000] * 5)
+    detector = DropDetector(history)
+
+    assert detector.is_significant_drop(ROUTE, 999.99)
+    assert not detector.is_significant_drop(ROUTE, 1_000)
+
+
+def test_detector_needs_enough_samples(history: PriceHistory) -> None:
+    record_prices(history, [1_000, 1_000])
+    detector = DropDetector(history, min_samples=3)
+
+    assert not detector.is_significant_drop(ROUTE, 100)
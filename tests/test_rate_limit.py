@@ -0,0 +1,47 @@
+import pytest
+
+from flight_deals.rate_limit import TokenBucket, backoff_delay
+from tests.fakes import FakeClock
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests(
+    clock: FakeClock,
+) -> None:
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_token_bucket_pause_holds_callers_back(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=10, burst=10, clock=clock, sleep=clock.sleep)
+
+    bucket.pause(3)
+    bucket.acquire()
+
+    assert clock.sleeps == [pytest.approx(3.1)]
+
+
+def test_token_bucket_spaces_callers_queued_during_a_pause(
+    clock: FakeClock,
+) -> None:
+    bucket = TokenBucket(rate=1, burst=5, clock=clock, sleep=clock.sleep)
+
+    bucket.pause(10)
+    clock.now += 4
+    for _ in range(15):
+        bucket.acquire()
+
+    assert clock.sleeps == [7 + call for call in range(15)]
+
+
+def test_backoff_delay_honours_retry_after() -> None:
+    assert backoff_delay(0, retry_after='7') == 7
+    assert 0 <= backoff_delay(3, base=1) <= 8
+
+
+def test_backoff_delay_caps_only_the_computed_delay() -> None:
+    assert backoff_delay(0, retry_after='120', cap=60) == 120
+    assert 0 <= backoff_delay(10, base=1, cap=5) <= 5
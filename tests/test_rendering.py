@@ -0,0 +1,63 @@
+import pytest
+from pytest_mock import MockFixture
+
+from flight_deals import rendering
+from flight_deals.flight_data import FlightItinerary
+from flight_deals.rendering import (
+    group_by_destination,
+    render_digest_html,
+    render_digest_text,
+    render_itinerary_text,
+)
+from tests.factories import ItineraryFactory
+
+
+@pytest.fixture
+def flights(make_itinerary: ItineraryFactory) -> list[FlightItinerary]:
+    return [
+        FlightItinerary.parse_obj(make_itinerary(city_code, price))
+        for city_code, price in (('PAR', 900), ('LIS', 300), ('PAR', 500))
+    ]
+
+
+def test_group_by_destination_sorts_sections_and_flights_by_price(
+    flights: list[FlightItinerary],
+) -> None:
+    sections = group_by_destination(flights)
+
+    assert list(sections) == ['LIS (LIS)', 'PAR (PAR)']
+    assert [flight.price for flight in sections['PAR (PAR)']] == [500, 900]
+
+
+def test_render_digest_text_has_one_section_per_destination(
+    flights: list[FlightItinerary],
+) -> None:
+    text = render_digest_text(flights)
+
+    assert text.count('=== PAR (PAR) ===') == 1
+    assert text.index('LIS (LIS)') < text.index('PAR (PAR)')
+    assert text.count('Price: ') == 3
+
+
+def test_render_digest_html_escapes_content(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    data = make_itinerary('PAR', 900)
+    data['route'][0]['cityFrom'] = '<Salvador>'
+
+    html = render_digest_html([FlightItinerary.parse_obj(data)])
+
+    assert '&lt;Salvador&gt;' in html
+
+
+def test_itinerary_text_is_rendered_once(
+    flights: list[FlightItinerary], mocker: MockFixture
+) -> None:
+    render = mocker.spy(rendering, '_render_itinerary_text')
+
+    texts = {render_itinerary_text(flights[0]) for _ in range(3)}
+    render_digest_text(flights)
+    render_digest_html(flights)
+
+    assert texts == {str(flights[0])}
+    assert render.call_count == len(flights)
@@ -0,0 +1,116 @@
+from typing import Any, Callable
+
+import pytest
+
+from flight_deals.scoring import (
+    Candidates,
+    ScoringRules,
+    _rank_numpy,
+    _rank_python,
+    has_numpy,
+)
+from tests.factories import ItineraryFactory
+
+RankFn = Callable[[Candidates, ScoringRules], list[int]]
+
+
+@pytest.fixture(
+    params=[
+        _rank_python,
+        pytest.param(
+            _rank_numpy,
+            marks=pytest.mark.skipif(
+                not has_numpy(), reason='NumPy is not installed'
+            ),
+        ),
+    ]
+)
+def rank(request: pytest.FixtureRequest) -> RankFn:
+    return request.param
+
+
+def make_candidates(
+    make_itinerary: ItineraryFactory,
+    results: dict[str, list[dict[str, Any]]],
+    price_cap: int | None = None,
+) -> Candidates:
+    candidates = Candidates()
+    for city_code, itineraries in results.items():
+        candidates.add(
+            {'fly_from': 'SSA', 'fly_to': city_code, 'price_to': price_cap},
+            itineraries,
+        )
+    return candidates
+
+
+def test_rank_keeps_the_best_per_query_by_price_per_night(
+    rank: RankFn, make_itinerary: ItineraryFactory
+) -> None:
+    long_stay = {**make_itinerary('PAR', 700), 'nightsInDest': 14}
+    candidates = make_candidates(
+        make_itinerary,
+        {
+            'PAR': [make_itinerary('PAR', 400), long_stay],
+            'LIS': [make_itinerary('LIS', 420)],
+            'TYO': [make_itinerary('TYO', 2_000)],
+        },
+        price_cap=1_000,
+    )
+
+    winners = rank(candidates, ScoringRules())
+
+    assert [candidates.itineraries[index] for index in winners] == [
+        long_stay,
+        candidates.itineraries[2],
+    ]
+
+
+def test_rank_filters_stopovers_and_prices_above_the_median(
+    rank: RankFn, make_itinerary: ItineraryFactory
+) -> None:
+    with_stopover = make_itinerary('LIS', 100)
+    with_stopover['route'].insert(1, with_stopover['route'][0])
+    candidates = make_candidates(
+        make_itinerary,
+        {
+            'LIS': [with_stopover],
+            'PAR': [make_itinerary('PAR', 900), make_itinerary('PAR', 500)],
+            'MAD': [make_itinerary('MAD', price) for price in (300, 300, 600)],
+        },
+    )
+
+    winners = rank(candidates, ScoringRules(max_stopovers=0, median_ratio=0.8))
+
+    assert [candidates.prices[index] for index in winners] == [500]
+
+
+def test_rank_limits_results_to_top_k(
+    rank: RankFn, make_itinerary: ItineraryFactory
+) -> None:
+    candidates = make_candidates(
+        make_itinerary,
+        {
+            code: [make_itinerary(code, price)]
+            for code, price in (('PAR', 300), ('LIS', 100), ('MAD', 200))
+        },
+    )
+
+    winners = rank(candidates, ScoringRules(top_k=2))
+
+    assert [
+        candidates.queries[candidates.groups[index]]['fly_to']
+        for index in winners
+    ] == [
+        'LIS',
+        'MAD',
+    ]
+
+
+def test_rank_skips_itineraries_without_a_price(
+    rank: RankFn, make_itinerary: ItineraryFactory
+) -> None:
+    unpriced = make_itinerary('PAR', 100)
+    del unpriced['price']
+    candidates = make_candidates(make_itinerary, {'PAR': [unpriced]})
+
+    assert rank(candidates, ScoringRules(within_price_cap=False)) == []
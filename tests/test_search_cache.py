@@ -0,0 +1,73 @@
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from flight_deals.flight_search import FlightSearchParams
+from flight_deals.search_cache import (
+    MemoryCache,
+    SearchCache,
+    SQLiteCache,
+    make_cache_key,
+)
+from tests.fakes import FakeClock
+
+CacheFactory = Callable[..., SearchCache]
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def make_cache(request: Any, tmp_path: Path, clock: FakeClock) -> CacheFactory:
+    def _make_cache(ttl: float = 60, max_entries: int = 10) -> SearchCache:
+        if request.param == 'memory':
+            return MemoryCache(ttl=ttl, max_entries=max_entries, clock=clock)
+        return SQLiteCache(
+            tmp_path / 'cache.sqlite3',
+            ttl=ttl,
+            max_entries=max_entries,
+            clock=clock,
+        )
+
+    return _make_cache
+
+
+def test_cache_key_ignores_field_order() -> None:
+    params: dict[str, Any] = {
+        'fly_from': 'SSA',
+        'fly_to': 'PAR',
+        'date_from': '01/01/2024',
+        'date_to': '01/02/2024',
+        'curr': 'BRL',
+    }
+
+    assert make_cache_key(FlightSearchParams(**params)) == make_cache_key(
+        FlightSearchParams(**dict(reversed(params.items())))
+    )
+
+
+def test_cache_entries_expire(
+    make_cache: CacheFactory, clock: FakeClock
+) -> None:
+    cache = make_cache(ttl=60)
+    cache.set('key', [{'id': '1'}])
+
+    assert cache.get('key') == [{'id': '1'}]
+
+    clock.now += 61
+    assert cache.get('key') is None
+
+
+def test_cache_evicts_least_recently_used_entries(
+    make_cache: CacheFactory, clock: FakeClock
+) -> None:
+    cache = make_cache(max_entries=2)
+    cache.set('a', [])
+    clock.now += 1
+    cache.set('b', [])
+    clock.now += 1
+    cache.get('a')
+    clock.now += 1
+    cache.set('c', [])
+
+    assert cache.get('a') == []
+    assert cache.get('b') is None
+    assert cache.get('c') == []
@@ -0,0 +1,33 @@
+from typing import Any
+
+from flight_deals.search_plan import SearchPlan
+
+DESTINATIONS = [
+    {'id': 2, 'iataCode': 'PAR', 'lowestPrice': 500},
+    {'id': 3, 'iataCode': 'TYO', 'lowestPrice': 900},
+    {'id': 4, 'iataCode': 'LIS', 'lowestPrice': 300},
+]
+
+
+def test_stream_does_not_run_ahead_of_the_consumer() -> None:
+    started = []
+
+    def search_flights(params: dict[str, Any]) -> list[dict[str, Any]]:
+        started.append(params['fly_to'])
+        return []
+
+    plan = SearchPlan(['SSA'], DESTINATIONS, {})
+    results = plan.stream(search_flights, max_workers=1, max_pending=1)
+
+    next(results)
+    assert started == ['PAR']
+
+    assert len(list(results)) == 2
+    assert started == ['PAR', 'TYO', 'LIS']
+
+
+def test_plan_skips_routes_to_the_origin_itself() -> None:
+    plan = SearchPlan(['LIS'], DESTINATIONS, {'curr': 'BRL'})
+
+    assert len(plan) == 2
+    assert all(query['fly_from'] == 'LIS' for query in plan.queries.values())
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from flight_deals.flight_data import FlightItinerary
+from flight_deals.sent_index import DAY, SentIndex, make_fingerprint
+from tests.factories import ItineraryFactory
+from tests.fakes import FakeClock
+
+
+@pytest.fixture
+def sent_index(tmp_path: Path, clock: FakeClock) -> SentIndex:
+    return SentIndex(tmp_path / 'sent.sqlite3', ttl=DAY, clock=clock)
+
+
+def test_fingerprint_ignores_changes_within_the_price_bucket(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    def fingerprint(price: int) -> str:
+        flight = FlightItinerary.parse_obj(make_itinerary('PAR', price))
+        return make_fingerprint(flight, price_bucket=50)
+
+    assert fingerprint(510) == fingerprint(540)
+    assert fingerprint(510) != fingerprint(560)
+
+
+def test_sent_flights_are_remembered_until_they_expire(
+    sent_index: SentIndex,
+    clock: FakeClock,
+    make_itinerary: ItineraryFactory,
+) -> None:
+    flight = FlightItinerary.parse_obj(make_itinerary('PAR', 500))
+
+    assert not sent_index.was_sent(flight)
+
+    sent_index.mark_sent([flight])
+    assert sent_index.was_sent(flight)
+
+    clock.now += DAY
+    assert not sent_index.was_sent(flight)
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from flight_deals import settings
+
+
+def test_settings_are_built_once_on_first_access() -> None:
+    assert settings.HTTP is settings.HTTP
+    assert isinstance(settings.HTTP, settings.HTTPSettings)
+
+
+def test_unknown_settings_raise_attribute_error() -> None:
+    with pytest.raises(AttributeError):
+        settings.UNKNOWN
+
+
+def test_cli_help_does_not_need_settings(tmp_path: Path) -> None:
+    root = Path(__file__).resolve().parents[1]
+
+    result = subprocess.run(
+        [sys.executable, '-m', 'flight_deals', '--help'],
+        cwd=tmp_path,
+        env={'PYTHONPATH': str(root)},
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert '--daemon' in result.stdout
@@ -0,0 +1,69 @@
+from typing import Any
+
+from flight_deals.sharding import (
+    cheapest_unique,
+    sharded,
+    split_date_window,
+)
+from tests.factories import ItineraryFactory
+
+
+def test_split_date_window_covers_the_range_without_overlap() -> None:
+    assert split_date_window('01/01/2023', '10/01/2023', days=4) == [
+        ('01/01/2023', '04/01/2023'),
+        ('05/01/2023', '08/01/2023'),
+        ('09/01/2023', '10/01/2023'),
+    ]
+
+
+def test_split_date_window_keeps_a_short_range_whole() -> None:
+    assert split_date_window('01/01/2023', '02/01/2023', days=30) == [
+        ('01/01/2023', '02/01/2023')
+    ]
+
+
+def test_sharded_search_merges_duplicates_and_keeps_the_cheapest(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    duplicate = make_itinerary('LIS', 300)
+    results = {
+        '01/01/2023': [
+            make_itinerary('LIS', 500, departure='2023-01-02T10:00:00.000Z'),
+            duplicate,
+        ],
+        '03/01/2023': [
+            duplicate,
+            make_itinerary('LIS', 100, departure='2023-01-03T10:00:00.000Z'),
+        ],
+    }
+    queries: list[dict[str, Any]] = []
+
+    def search_flights(query: dict[str, Any]) -> list[dict[str, Any]]:
+        queries.append(query)
+        return results[query['date_from']]
+
+    search = sharded(search_flights, days=2)
+    cheapest = search(
+        {'date_from': '01/01/2023', 'date_to': '04/01/2023', 'limit': 2}
+    )
+
+    assert [itinerary['price'] for itinerary in cheapest] == [100, 300]
+    assert sorted(query['date_to'] for query in queries) == [
+        '02/01/2023',
+        '04/01/2023',
+    ]
+
+
+def test_cheapest_unique_evicts_the_most_expensive(
+    make_itinerary: ItineraryFactory,
+) -> None:
+    itineraries = [
+        make_itinerary('LIS', price, departure=f'2023-01-0{day}T10:00:00Z')
+        for day, price in enumerate((400, 100, 300, 100, 200), start=1)
+    ]
+
+    cheapest = cheapest_unique(
+        [*itineraries, itineraries[1], itineraries[4]], limit=3
+    )
+
+    assert cheapest == [itineraries[1], itineraries[3], itineraries[4]]
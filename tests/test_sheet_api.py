@@ -5,6 +5,7 @@ from urllib.parse import urljoin
 import pytest
 from mypy_extensions import DefaultArg
 from pydantic import HttpUrl, SecretStr, parse_obj_as
+from pytest_mock import MockFixture
 from requests.exceptions import HTTPError
 from requests_mock import Mocker
 
@@ -111,3 +112,54 @@ def test_update_sheet_row_successfully(
     result = sheet_api.update_sheet_row(TEST_SHEET_NAME, row_id, body)
 
     assert result == body
+
+
+def test_sheet_api_closes_its_own_session_on_exit(
+    make_sheet_api: SheetAPIFactory, mocker: MockFixture
+) -> None:
+    with make_sheet_api(TEST_URL, TEST_AUTH) as sheet_api:
+        close = mocker.spy(sheet_api.session, 'close')
+
+    close.assert_called_once()
+
+
+def test_update_sheet_rows_reports_failures_per_row(
+    make_sheet_api: SheetAPIFactory, requests_mock: Mocker
+) -> None:
+
+    sheet_api = make_sheet_api(TEST_URL, TEST_AUTH)
+    rows = [{'id': row_id, 'city': 'x'} for row_id in (2, 3, 4)]
+
+    for row in rows:
+        requests_mock.put(
+            url=urljoin(
+                sheet_api.spreadsheet_url,
+                posixpath.join(TEST_SHEET_NAME, str(row['id'])),
+            ),
+            status_code=500 if row['id'] == 3 else 200,
+            json={TEST_SHEET_NAME: row},
+        )
+
+    result = sheet_api.update_sheet_rows(TEST_SHEET_NAME, rows)
+
+    assert sorted(result.updated) == [2, 4]
+    assert list(result.failed) == [3]
+    assert isinstance(result.failed[3], HTTPError)
+
+
+def test_get_rows_if_changed_returns_none_when_not_modified(
+    make_sheet_api: SheetAPIFactory, requests_mock: Mocker
+) -> None:
+
+    sheet_api = make_sheet_api(TEST_URL, TEST_AUTH)
+
+    requests_mock.get(
+        url=urljoin(sheet_api.spreadsheet_url, TEST_SHEET_NAME),
+        request_headers={'If-None-Match': '"v1"'},
+        status_code=304,
+    )
+
+    assert sheet_api.get_rows_if_changed(TEST_SHEET_NAME, '"v1"') == (
+        None,
+        '"v1"',
+    )